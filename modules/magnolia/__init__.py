@@ -20,6 +20,8 @@ __all__ = [
 
 
 from .animation import *
+from .animation.keyframes import *
+from .animation.opacity import *
 from .animation.visibility import *
 
 from .objects import *
@@ -27,6 +29,7 @@ from .objects.constraint import *
 from .objects.geonodes import *
 from .objects.location import *
 from .objects.material import *
+from .objects.merge import *
 from .objects.mesh import *
 from .objects.modifier import *
 from .objects.object import *
@@ -35,6 +38,8 @@ from .scene import *
 from .scene.camera import *
 from .scene.collection import *
 from .scene.context import *
+from .scene.names import *
 from .scene.output import *
+from .scene.render import *
 
 from . import slides
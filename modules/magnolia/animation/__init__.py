@@ -1,3 +1,9 @@
-__all__ = ["visibility"]
+__all__ = [
+    "keyframes",
+    "opacity",
+    "visibility",
+]
 
+from .keyframes import *
+from .opacity import *
 from .visibility import *
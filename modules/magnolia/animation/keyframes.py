@@ -0,0 +1,652 @@
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Hashable,
+    Iterator,
+    Literal,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+import bpy
+import numpy as np
+
+from ..objects.object import hierarchy_scope
+
+
+Interpolation = Literal[
+    "CONSTANT",
+    "LINEAR",
+    "BEZIER",
+    "BACK",
+    "BOUNCE",
+    "CIRC",
+    "CUBIC",
+    "ELASTIC",
+    "EXPO",
+    "QUAD",
+    "QUART",
+    "QUINT",
+    "SINE",
+]
+"""Interpolation mode of a keyframe, towards the next keyframe."""
+
+Easing = Literal["AUTO", "EASE_IN", "EASE_OUT", "EASE_IN_OUT"]
+"""Easing mode of a keyframe, used by the dynamic interpolation modes."""
+
+# Keyframe enums are written with `foreach_set`, which takes the raw values Blender stores
+# for each enum item rather than the item identifiers.
+INTERPOLATION_VALUES: dict[str, int] = {
+    "CONSTANT": 0,
+    "LINEAR": 1,
+    "BEZIER": 2,
+    "BACK": 3,
+    "BOUNCE": 4,
+    "CIRC": 5,
+    "CUBIC": 6,
+    "ELASTIC": 7,
+    "EXPO": 8,
+    "QUAD": 9,
+    "QUART": 10,
+    "QUINT": 11,
+    "SINE": 12,
+}
+EASING_VALUES: dict[str, int] = {
+    "AUTO": 0,
+    "EASE_IN": 1,
+    "EASE_OUT": 2,
+    "EASE_IN_OUT": 3,
+}
+HANDLE_AUTO_CLAMPED = 4
+
+EasingPreset = Literal[
+    "constant",
+    "linear",
+    "smooth",
+    "ease_in",
+    "ease_out",
+    "ease_in_out",
+    "back",
+    "bounce",
+    "elastic",
+]
+"""Named easing for an animation, mapping to a keyframe interpolation and easing mode."""
+
+EASING_PRESETS: dict[str, tuple[Interpolation, Easing]] = {
+    "constant": ("CONSTANT", "AUTO"),
+    "linear": ("LINEAR", "AUTO"),
+    "smooth": ("BEZIER", "AUTO"),
+    "ease_in": ("CUBIC", "EASE_IN"),
+    "ease_out": ("CUBIC", "EASE_OUT"),
+    "ease_in_out": ("CUBIC", "EASE_IN_OUT"),
+    "back": ("BACK", "EASE_OUT"),
+    "bounce": ("BOUNCE", "EASE_OUT"),
+    "elastic": ("ELASTIC", "EASE_OUT"),
+}
+
+T = TypeVar("T")
+
+
+def stagger_frames(
+    count: int,
+    frame: int,
+    duration: Union[int, Sequence[int]],
+    delay: Optional[int] = None,
+) -> tuple[list[int], list[int]]:
+    """
+    Computes start and end frames for animating many objects one after another.
+
+    Arguments:
+
+    - `count`: Number of objects being animated
+    - `frame`: Frame at which the first animation starts
+    - `duration`: Length of each animation in frames, or one length per object
+
+    Optional arguments:
+
+    - `delay`: Number of frames between the starts of consecutive animations, defaults to 0
+
+    Returns: Lists of the start frames and end frames of each animation
+    """
+    starts = frame + np.arange(count) * (delay or 0)
+    durations = np.broadcast_to(np.asarray(duration), (count,))
+    return starts.tolist(), (starts + durations).tolist()
+
+
+def get_or_create_fcurve(
+    id_data: bpy.types.ID, data_path: str, index: int = 0
+) -> bpy.types.FCurve:
+    """
+    Returns the F-curve animating a property of an ID, creating the action and F-curve if needed.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose property is animated
+    - `data_path`: Path to the animated property, e.g. `"hide_render"` or `'["mg_opacity"]'`
+
+    Optional arguments:
+
+    - `index`: Array index of the property, defaults to 0
+
+    Returns: The F-curve for the property
+    """
+    fcurves = _action_fcurves(id_data)
+    fcurve = fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = fcurves.new(data_path, index=index)
+    return fcurve
+
+
+def find_fcurve(
+    id_data: bpy.types.ID, data_path: str, index: int = 0
+) -> Optional[bpy.types.FCurve]:
+    """
+    Returns the F-curve animating a property of an ID, or `None` if the property isn't animated.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose property is animated
+    - `data_path`: Path to the animated property
+
+    Optional arguments:
+
+    - `index`: Array index of the property, defaults to 0
+    """
+    fcurves = _existing_fcurves(id_data)
+    if fcurves is None:
+        return None
+    return fcurves.find(data_path, index=index)
+
+
+def remove_fcurve(id_data: bpy.types.ID, data_path: str, index: int = 0):
+    """
+    Removes the F-curve animating a property of an ID, if there is one.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose property is animated
+    - `data_path`: Path to the animated property
+
+    Optional arguments:
+
+    - `index`: Array index of the property, defaults to 0
+    """
+    fcurves = _existing_fcurves(id_data)
+    if fcurves is None:
+        return
+    fcurve = fcurves.find(data_path, index=index)
+    if fcurve is not None:
+        fcurves.remove(fcurve)
+
+
+def _action_fcurves(id_data: bpy.types.ID):
+    """
+    Returns the F-curve collection of the action animating an ID, creating the action if needed.
+    """
+    anim = cast(
+        bpy.types.AnimData,
+        id_data.animation_data or id_data.animation_data_create(),  # pyright: ignore
+    )
+    if anim.action is None:
+        anim.action = bpy.data.actions.new(f"{id_data.name}Action")
+    action = anim.action
+
+    # Legacy actions store F-curves directly on the action
+    if hasattr(action, "fcurves"):
+        return action.fcurves  # pyright: ignore
+
+    # Layered actions store F-curves in a channelbag for the slot animating the ID
+    from bpy_extras import anim_utils
+
+    if anim.action_slot is None:
+        anim.action_slot = action.slots.new(id_data.id_type, id_data.name)
+    return anim_utils.action_ensure_channelbag_for_slot(
+        action, anim.action_slot
+    ).fcurves
+
+
+def animated_fcurves(id_data: bpy.types.ID) -> list[bpy.types.FCurve]:
+    """
+    Returns all F-curves of the action animating an ID, without creating anything.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose F-curves to return
+
+    Returns: List of F-curves, empty if the ID isn't animated
+    """
+    fcurves = _existing_fcurves(id_data)
+    return list(fcurves) if fcurves is not None else []
+
+
+def _existing_fcurves(id_data: bpy.types.ID):
+    """
+    Returns the F-curve collection of the action animating an ID, or `None` if it has none,
+    without creating anything.
+    """
+    anim = getattr(id_data, "animation_data", None)
+    if anim is None or anim.action is None:
+        return None
+    action = anim.action
+    if hasattr(action, "fcurves"):
+        return action.fcurves  # pyright: ignore
+    if anim.action_slot is None:
+        return None
+
+    from bpy_extras import anim_utils
+
+    channelbag = anim_utils.action_get_channelbag_for_slot(action, anim.action_slot)
+    return channelbag.fcurves if channelbag is not None else None
+
+
+def changing_spans(fcurve: bpy.types.FCurve) -> np.ndarray:
+    """
+    Returns the frame ranges in which the value of an F-curve changes.
+
+    The value is constant outside of these ranges, such as during holds between keyframes with
+    equal values, after constant keyframes, and before the first or after the last keyframe.
+
+    Arguments:
+
+    - `fcurve`: The F-curve to inspect
+
+    Returns: Array of shape (N, 2), where each row is a (start, end) frame range. Ranges may
+    extend to infinity.
+    """
+    if fcurve.mute:
+        return np.empty((0, 2))
+    if len(fcurve.modifiers) > 0:
+        # Modifiers such as noise can change the value anywhere
+        return np.array([[-np.inf, np.inf]])
+
+    keyframes = _read_keyframes(fcurve)
+    frames = keyframes["frame"]
+    values = keyframes["value"]
+    if len(frames) < 2:
+        return np.empty((0, 2))
+
+    # A segment is flat if it is constant, or if its keyframes and Bézier handles are all level
+    level = values[:-1] == values[1:]
+    bezier = keyframes["interpolation"][:-1] == INTERPOLATION_VALUES["BEZIER"]
+    constant = keyframes["interpolation"][:-1] == INTERPOLATION_VALUES["CONSTANT"]
+    handles_level = (keyframes["handle_right"][:-1, 1] == values[:-1]) & (
+        keyframes["handle_left"][1:, 1] == values[1:]
+    )
+    flat = constant | (level & (~bezier | handles_level))
+    spans = np.column_stack((frames[:-1], frames[1:]))[~flat]
+
+    # A constant segment holds its value, then jumps to the value of the next keyframe on that
+    # keyframe, so it changes within a span that ends on that keyframe
+    jumps = frames[1:][constant & ~level].astype(np.float64)
+    if len(jumps) > 0:
+        spans = np.concatenate(
+            (spans, np.column_stack((np.nextafter(jumps, -np.inf), jumps))), axis=0
+        )
+
+    if fcurve.extrapolation == "LINEAR" and not flat.all():
+        spans = np.concatenate(
+            (spans, [[-np.inf, frames[0]], [frames[-1], np.inf]]), axis=0
+        )
+    return spans
+
+
+def write_keyframes(
+    fcurve: bpy.types.FCurve,
+    frames: Union[Sequence[float], np.ndarray],
+    values: Union[Sequence[float], Sequence[bool], np.ndarray],
+    interpolation: Union[Interpolation, Sequence[Interpolation]] = "BEZIER",
+    easing: Union[Easing, Sequence[Easing]] = "AUTO",
+    replace: bool = False,
+):
+    """
+    Writes many keyframes to an F-curve at once.
+
+    Unless `replace` is set, keyframes are merged with the keyframes already on the F-curve: a new
+    keyframe replaces an existing keyframe on the same frame. When several new keyframes share a
+    frame, the last one wins. The whole F-curve is then written in a single pass with
+    `foreach_set`.
+
+    Arguments:
+
+    - `fcurve`: The F-curve to write to
+    - `frames`: Frame of each keyframe
+    - `values`: Value of each keyframe, as numbers or booleans
+
+    Optional arguments:
+
+    - `interpolation`: Interpolation of every keyframe, or one per keyframe; defaults to "BEZIER"
+    - `easing`: Easing of every keyframe, or one per keyframe; defaults to "AUTO"
+    - `replace`: Whether to remove all existing keyframes first, defaults to `False`
+    """
+    frame_array = np.asarray(frames, dtype=np.float32)
+    value_array = np.asarray(values, dtype=np.float32)
+    count = len(frame_array)
+    if frame_array.ndim != 1 or value_array.shape != frame_array.shape:
+        raise ValueError(
+            f"Expected one value for each of {count} frames, got shape {value_array.shape}"
+        )
+    if count == 0 and not replace:
+        return
+    _write_keyframe_arrays(
+        fcurve,
+        _keyframe_arrays(
+            frame_array,
+            value_array,
+            _enum_array(interpolation, INTERPOLATION_VALUES, count),
+            _enum_array(easing, EASING_VALUES, count),
+        ),
+        replace,
+    )
+
+
+def read_keyframes(fcurve: bpy.types.FCurve) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the frames and values of all keyframes of an F-curve.
+
+    Arguments:
+
+    - `fcurve`: The F-curve to read
+
+    Returns: Arrays of the frame and value of each keyframe
+    """
+    keyframes = _read_keyframes(fcurve)
+    return keyframes["frame"], keyframes["value"]
+
+
+def _write_keyframe_arrays(
+    fcurve: bpy.types.FCurve, new: dict[str, np.ndarray], replace: bool = False
+):
+    """
+    Merges arrays of new keyframes into an F-curve, or replaces its keyframes, and writes the
+    result.
+    """
+    # Existing keyframes come first, so that new keyframes on the same frame take precedence
+    points = fcurve.keyframe_points
+    if len(points) > 0 and not replace:
+        existing = _read_keyframes(fcurve)
+        new = {key: np.concatenate((existing[key], new[key])) for key in new}
+
+    # Sort by frame, keeping only the last keyframe written to each frame
+    order = np.argsort(new["frame"], kind="stable")[::-1]
+    _, last = np.unique(new["frame"][order], return_index=True)
+    keep = order[last]
+    keyframes = {key: array[keep] for key, array in new.items()}
+
+    points.clear()
+    points.add(len(keep))
+    points.foreach_set(
+        "co", np.column_stack((keyframes["frame"], keyframes["value"])).ravel()
+    )
+    points.foreach_set("handle_left", keyframes["handle_left"].ravel())
+    points.foreach_set("handle_right", keyframes["handle_right"].ravel())
+    points.foreach_set("handle_left_type", keyframes["handle_left_type"])
+    points.foreach_set("handle_right_type", keyframes["handle_right_type"])
+    points.foreach_set("interpolation", keyframes["interpolation"])
+    points.foreach_set("easing", keyframes["easing"])
+
+    # Recalculate automatic handles now that all keyframes are in place
+    fcurve.update()
+
+
+class KeyframeTrack:
+    """
+    Keyframes collected for a single F-curve until the enclosing batch is flushed.
+    """
+
+    def __init__(self, id_data: bpy.types.ID, data_path: str, index: int = 0):
+        self.id_data = id_data
+        self.data_path = data_path
+        self.index = index
+        self.frames: list[float] = []
+        self.values: list[float] = []
+        self.interpolations: list[int] = []
+        self.easings: list[int] = []
+
+    def add(
+        self,
+        frames: Sequence[float],
+        values: Sequence[float],
+        interpolation: Union[Interpolation, Sequence[Interpolation]] = "BEZIER",
+        easing: Union[Easing, Sequence[Easing]] = "AUTO",
+    ):
+        """
+        Records keyframes to be written when the track is flushed.
+        """
+        count = len(frames)
+        self.frames.extend(frames)
+        self.values.extend(values)
+        self.interpolations.extend(
+            _enum_array(interpolation, INTERPOLATION_VALUES, count)
+        )
+        self.easings.extend(_enum_array(easing, EASING_VALUES, count))
+
+    def flush(self):
+        """
+        Writes all recorded keyframes to the F-curve in a single pass. On each frame, the last
+        recorded keyframe wins.
+        """
+        if not self.frames:
+            return
+        fcurve = get_or_create_fcurve(self.id_data, self.data_path, self.index)
+        _write_keyframe_arrays(
+            fcurve,
+            _keyframe_arrays(
+                np.array(self.frames, dtype=np.float32),
+                np.array(self.values, dtype=np.float32),
+                np.array(self.interpolations, dtype=np.int32),
+                np.array(self.easings, dtype=np.int32),
+            ),
+        )
+        self.clear()
+
+    def clear(self):
+        """
+        Discards all recorded keyframes.
+        """
+        self.frames.clear()
+        self.values.clear()
+        self.interpolations.clear()
+        self.easings.clear()
+
+
+class AnimationBatch:
+    """
+    Animation work deferred until the end of a `batch()` block.
+
+    Work is grouped into tracks, such as one `KeyframeTrack` per F-curve. Each track has a `flush`
+    method that is called once when the batch ends.
+    """
+
+    def __init__(self):
+        self.tracks: dict[Hashable, Any] = {}
+
+    def track(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        Returns the track for a key, creating it with `factory` if the batch doesn't have it yet.
+        """
+        track = self.tracks.get(key)
+        if track is None:
+            track = self.tracks[key] = factory()
+        return track
+
+    def flush(self):
+        """
+        Flushes every track in the batch.
+        """
+        for track in self.tracks.values():
+            track.flush()
+        self.tracks.clear()
+
+
+_active_batch: Optional[AnimationBatch] = None
+
+
+@contextmanager
+def batch() -> Iterator[AnimationBatch]:
+    """
+    Defers animation inside a `with` block and writes it all at the end of the block.
+
+    Inside the block, Magnolia animation helpers record keyframes instead of writing them to
+    Blender. When the block ends, keyframes are sorted and deduplicated, and each F-curve is written
+    once. Nested `batch()` blocks join the outermost batch. If the block raises an exception,
+    recorded keyframes are discarded.
+
+    The block is also a `hierarchy_scope()`, so object hierarchies are indexed once for the whole
+    batch rather than once per call.
+
+    Example:
+
+    ```python
+    with mg.animation.batch():
+        for i, obj in enumerate(objects):
+            mg.show_at(obj, i * 5)
+    ```
+
+    Returns: The active batch
+    """
+    global _active_batch
+    if _active_batch is not None:
+        yield _active_batch
+        return
+
+    _active_batch = AnimationBatch()
+    try:
+        with hierarchy_scope():
+            yield _active_batch
+        _active_batch.flush()
+    finally:
+        _active_batch = None
+
+
+def insert_keyframes(
+    id_data: bpy.types.ID,
+    data_path: str,
+    frames: Sequence[float],
+    values: Sequence[float],
+    index: int = 0,
+    interpolation: Union[Interpolation, Sequence[Interpolation]] = "BEZIER",
+    easing: Union[Easing, Sequence[Easing]] = "AUTO",
+):
+    """
+    Inserts keyframes for a property of an ID.
+
+    Inside a `batch()` block, keyframes are recorded and written when the block ends. Otherwise,
+    they are written immediately.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose property is animated
+    - `data_path`: Path to the animated property
+    - `frames`: Frame of each keyframe
+    - `values`: Value of each keyframe, as numbers or booleans
+
+    Optional arguments:
+
+    - `index`: Array index of the property, defaults to 0
+    - `interpolation`: Interpolation of every keyframe, or one per keyframe; defaults to "BEZIER"
+    - `easing`: Easing of every keyframe, or one per keyframe; defaults to "AUTO"
+    """
+    with batch() as current:
+        track = current.track(
+            (id_data, data_path, index),
+            lambda: KeyframeTrack(id_data, data_path, index),
+        )
+        track.add(frames, values, interpolation, easing)
+
+
+def pending_keyframes(
+    id_data: bpy.types.ID, data_path: str, index: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the keyframes of a property that are recorded in the active `batch()` block and not
+    written yet.
+
+    Arguments:
+
+    - `id_data`: The ID (object, material, etc.) whose property is animated
+    - `data_path`: Path to the animated property
+
+    Optional arguments:
+
+    - `index`: Array index of the property, defaults to 0
+
+    Returns: Arrays of the frame and value of each pending keyframe, empty outside of a batch
+    """
+    track = None
+    if _active_batch is not None:
+        track = _active_batch.tracks.get((id_data, data_path, index))
+    if not isinstance(track, KeyframeTrack):
+        return np.empty(0), np.empty(0)
+    return np.array(track.frames, dtype=np.float64), np.array(
+        track.values, dtype=np.float64
+    )
+
+
+def _enum_array(
+    arg: Union[str, Sequence[str]], values: dict[str, int], count: int
+) -> np.ndarray:
+    """
+    Converts one enum identifier, or one identifier per keyframe, to an array of raw enum values.
+    """
+    if isinstance(arg, str):
+        return np.full(count, values[arg], dtype=np.int32)
+    return np.array([values[item] for item in arg], dtype=np.int32)
+
+
+def _keyframe_arrays(
+    frames: np.ndarray,
+    values: np.ndarray,
+    interpolations: np.ndarray,
+    easings: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Builds the arrays describing new keyframes with automatically clamped handles.
+    """
+    co = np.column_stack((frames, values))
+    return {
+        "frame": frames,
+        "value": values,
+        "handle_left": co.copy(),
+        "handle_right": co.copy(),
+        "handle_left_type": np.full(len(frames), HANDLE_AUTO_CLAMPED, dtype=np.int32),
+        "handle_right_type": np.full(len(frames), HANDLE_AUTO_CLAMPED, dtype=np.int32),
+        "interpolation": interpolations,
+        "easing": easings,
+    }
+
+
+def _read_keyframes(fcurve: bpy.types.FCurve) -> dict[str, np.ndarray]:
+    """
+    Reads all keyframes of an F-curve into arrays.
+    """
+    points = fcurve.keyframe_points
+    count = len(points)
+    co = np.empty(count * 2, dtype=np.float32)
+    handle_left = np.empty(count * 2, dtype=np.float32)
+    handle_right = np.empty(count * 2, dtype=np.float32)
+    handle_left_type = np.empty(count, dtype=np.int32)
+    handle_right_type = np.empty(count, dtype=np.int32)
+    interpolations = np.empty(count, dtype=np.int32)
+    easings = np.empty(count, dtype=np.int32)
+    points.foreach_get("co", co)
+    points.foreach_get("handle_left", handle_left)
+    points.foreach_get("handle_right", handle_right)
+    points.foreach_get("handle_left_type", handle_left_type)
+    points.foreach_get("handle_right_type", handle_right_type)
+    points.foreach_get("interpolation", interpolations)
+    points.foreach_get("easing", easings)
+    co = co.reshape(count, 2)
+    return {
+        "frame": co[:, 0],
+        "value": co[:, 1],
+        "handle_left": handle_left.reshape(count, 2),
+        "handle_right": handle_right.reshape(count, 2),
+        "handle_left_type": handle_left_type,
+        "handle_right_type": handle_right_type,
+        "interpolation": interpolations,
+        "easing": easings,
+    }
@@ -0,0 +1,162 @@
+from typing import cast, Optional, Sequence, Union
+
+import numpy as np
+
+from bpy.types import Object
+
+from ..objects import ObjectArg, ObjectsArg, resolve_objects
+from ..scene import current_frame, selections
+from .keyframes import (
+    batch,
+    EASING_PRESETS,
+    EasingPreset,
+    find_fcurve,
+    insert_keyframes,
+    pending_keyframes,
+    read_keyframes,
+    stagger_frames,
+)
+from .visibility import toggle_objects_visibility
+
+
+def fade_in(
+    args: Optional[ObjectsArg] = None,
+    frame: Optional[int] = None,
+    duration: Union[int, Sequence[int]] = 15,
+    delay: Optional[int] = None,
+    easing: EasingPreset = "smooth",
+):
+    """
+    Animates an object appearing and fading from transparent to opaque.
+
+    Objects need a material with opacity controls, which reads the `mg_opacity` property.
+
+    Optional arguments:
+
+    - `args`: Objects to animate, defaults to selected objects
+    - `frame`: Frame at which animation should start, defaults to current frame
+    - `duration`: Length of animation in frames, or one length per object; defaults to 15 frames
+    - `delay`: Amount of time between animations, if multiple objects; defaults to 0
+    - `easing`: Easing preset for the animation, defaults to "smooth"
+    """
+    objs = resolve_objects(args) if args is not None else selections()
+    starts, ends = stagger_frames(
+        len(objs), frame if frame is not None else current_frame(), duration, delay
+    )
+    with batch():
+        toggle_objects_visibility(cast(list[ObjectArg], objs), starts, True)
+        _animate_opacity(objs, starts, ends, 0, 1, easing)
+
+
+def fade_out(
+    args: Optional[ObjectsArg] = None,
+    frame: Optional[int] = None,
+    duration: Union[int, Sequence[int]] = 15,
+    delay: Optional[int] = None,
+    easing: EasingPreset = "smooth",
+):
+    """
+    Animates an object fading from its current opacity to transparent, then disappearing.
+
+    Objects need a material with opacity controls, which reads the `mg_opacity` property.
+
+    Optional arguments:
+
+    - `args`: Objects to animate, defaults to selected objects
+    - `frame`: Frame at which animation should start, defaults to current frame
+    - `duration`: Length of animation in frames, or one length per object; defaults to 15 frames
+    - `delay`: Amount of time between animations, if multiple objects; defaults to 0
+    - `easing`: Easing preset for the animation, defaults to "smooth"
+    """
+    objs = resolve_objects(args) if args is not None else selections()
+    starts, ends = stagger_frames(
+        len(objs), frame if frame is not None else current_frame(), duration, delay
+    )
+    with batch():
+        _animate_opacity(objs, starts, ends, None, 0, easing)
+        toggle_objects_visibility(cast(list[ObjectArg], objs), ends, False)
+
+
+def fade_to(
+    args: Optional[ObjectsArg] = None,
+    opacity: float = 1.0,
+    frame: Optional[int] = None,
+    duration: Union[int, Sequence[int]] = 15,
+    delay: Optional[int] = None,
+    easing: EasingPreset = "smooth",
+    start_opacity: Optional[float] = None,
+):
+    """
+    Animates the opacity of an object towards a target value.
+
+    Optional arguments:
+
+    - `args`: Objects to animate, defaults to selected objects
+    - `opacity`: Opacity at the end of the animation, between 0 and 1; defaults to 1
+    - `frame`: Frame at which animation should start, defaults to current frame
+    - `duration`: Length of animation in frames, or one length per object; defaults to 15 frames
+    - `delay`: Amount of time between animations, if multiple objects; defaults to 0
+    - `easing`: Easing preset for the animation, defaults to "smooth"
+    - `start_opacity`: Opacity at the start of the animation. Defaults to each object's opacity
+      at the start frame.
+    """
+    objs = resolve_objects(args) if args is not None else selections()
+    starts, ends = stagger_frames(
+        len(objs), frame if frame is not None else current_frame(), duration, delay
+    )
+    _animate_opacity(objs, starts, ends, start_opacity, opacity, easing)
+
+
+def _animate_opacity(
+    objs: list[Object],
+    starts: list[int],
+    ends: list[int],
+    start_opacity: Optional[float],
+    end_opacity: float,
+    easing: EasingPreset,
+):
+    """
+    Animates the `mg_opacity` property of each object between its start and end frames.
+    """
+    interpolation, easing_mode = EASING_PRESETS[easing]
+    with batch():
+        for obj, start, end in zip(objs, starts, ends):
+            # The property must exist on the object for its animation to be applied
+            if "mg_opacity" not in obj:
+                obj["mg_opacity"] = 1.0
+            start_value = start_opacity
+            if start_value is None:
+                start_value = _opacity_at(obj, start)
+            insert_keyframes(
+                obj,
+                '["mg_opacity"]',
+                [start, end],
+                [start_value, end_opacity],
+                interpolation=interpolation,
+                easing=easing_mode,
+            )
+
+
+def _opacity_at(obj: Object, frame: int) -> float:
+    """
+    Returns the opacity of an object at a frame, based on its keyframes written so far and its
+    keyframes pending in a `batch()` block.
+    """
+    fcurve = find_fcurve(obj, '["mg_opacity"]')
+    pending_frames, pending_values = pending_keyframes(obj, '["mg_opacity"]')
+    if len(pending_frames) == 0:
+        if fcurve is not None:
+            return fcurve.evaluate(frame)
+        return float(cast(float, obj["mg_opacity"]))
+
+    # Pending keyframes take precedence over written keyframes on the same frame. Between
+    # keyframes, the opacity is interpolated linearly.
+    frames, values = (
+        read_keyframes(fcurve) if fcurve is not None else (np.empty(0), np.empty(0))
+    )
+    frames = np.concatenate((frames, pending_frames))
+    values = np.concatenate((values, pending_values))
+    order = np.argsort(frames, kind="stable")[::-1]
+    _, last = np.unique(frames[order], return_index=True)
+    keep = order[last]
+    return float(np.interp(frame, frames[keep], values[keep]))
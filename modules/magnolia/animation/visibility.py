@@ -1,7 +1,44 @@
-from typing import cast, Optional
-
-from ..objects import ObjectArg, ObjectsArg, resolve_object, resolve_objects
-from ..scene import current_frame, selections
+import json
+import numbers
+
+from typing import cast, Optional, Sequence, Union
+
+import bpy
+import numpy as np
+
+from bpy.types import Object
+
+from ..objects import (
+    get_hierarchy_index,
+    ObjectArg,
+    ObjectsArg,
+    resolve_object,
+    resolve_objects,
+)
+from ..scene import (
+    CollectionArg,
+    create_collection,
+    current_frame,
+    resolve_collection,
+    selections,
+)
+from .keyframes import (
+    batch,
+    EASING_PRESETS,
+    EasingPreset,
+    find_fcurve,
+    get_or_create_fcurve,
+    insert_keyframes,
+    read_keyframes,
+    remove_fcurve,
+    stagger_frames,
+    write_keyframes,
+)
+
+# Custom property that holds the visibility animation of an object in a visibility group. The
+# group's drivers replace the animation of `hide_viewport` and `hide_render`, and combine this
+# property with the visibility of the object's groups instead.
+OWN_HIDDEN_PROPERTY = "mg_hidden"
 
 
 def toggle_object_visibility(
@@ -21,24 +58,194 @@ def toggle_object_visibility(
     - `children`: Whether children of the object should also have visibility animated, defaults to
       `True`
     """
-    obj = resolve_object(arg)
+    toggle_objects_visibility(arg, frame, is_visible, children)
+
+
+def toggle_objects_visibility(
+    args: ObjectsArg,
+    frames: Union[int, Sequence[int]],
+    is_visible: Union[bool, Sequence[bool]],
+    children: bool = True,
+):
+    """
+    Sets frames at which many objects should become visible or invisible.
+
+    Toggles are collected into a `VisibilitySchedule` per object within a single animation batch.
+    When the batch ends, each schedule is merged with the object's existing visibility keyframes
+    and compiled into the minimal set of keyframes, and each `hide_viewport`/`hide_render` F-curve
+    is written once.
+
+    Arguments:
+
+    - `args`: Objects to make visible or invisible. An object may appear more than once to toggle
+      it at several frames.
+    - `frames`: Frame at which the visibility should be updated, or one frame per object
+    - `is_visible`: `True` if objects should become visible, `False` if they should become
+      invisible, or one value per object
+
+    Optional arguments:
+
+    - `children`: Whether children of the objects should also have visibility animated, defaults
+      to `True`
+    """
+    objs = resolve_objects(args)
+    if isinstance(frames, numbers.Integral):
+        frames = [int(frames)] * len(objs)
+    frames = cast(Sequence[int], frames)
+    if isinstance(is_visible, (bool, np.bool_)):
+        is_visible = [bool(is_visible)] * len(objs)
+    if len(frames) != len(objs) or len(is_visible) != len(objs):
+        raise ValueError(
+            f"Expected {len(objs)} frames and visibilities, "
+            f"got {len(frames)} and {len(is_visible)}"
+        )
+
+    with batch() as current:
+        index = get_hierarchy_index()
+        for obj, frame, visible in zip(objs, frames, is_visible):
+            targets = index.descendants(obj, include_self=True) if children else [obj]
+            for target in targets:
+                track = current.track(
+                    (target, "visibility"), lambda: VisibilityTrack(target)
+                )
+                track.schedule.toggle(frame, visible)
+
+
+class VisibilitySchedule:
+    """
+    When an object is visible, as a set of toggles resolved into merged visible intervals.
 
-    # At (frame - 1), add keyframe that is the opposite of the end visibility state
-    obj.hide_viewport = is_visible
-    obj.hide_render = is_visible
-    obj.keyframe_insert("hide_viewport", frame=frame - 1)
-    obj.keyframe_insert("hide_render", frame=frame - 1)
+    Each toggle makes the object visible or invisible from a frame onwards. Toggles that don't
+    change the visibility are redundant, and a later toggle on the same frame replaces an earlier
+    one, so overlapping or repeated `show_at`/`hide_at` calls can't conflict. The object is
+    considered to be in the opposite state of its first toggle before that toggle.
 
-    # At (frame), add keyframe that is the end visibility state
-    obj.hide_viewport = not is_visible
-    obj.hide_render = not is_visible
-    obj.keyframe_insert("hide_viewport", frame=frame)
-    obj.keyframe_insert("hide_render", frame=frame)
+    A schedule compiles into the minimal set of constant keyframes: one keyframe just before the
+    first toggle, then one keyframe per change of visibility.
+    """
 
-    # If we should apply animation to children, then recursively call on children
-    if children:
-        for child in obj.children:
-            toggle_object_visibility(child, frame, is_visible, children)
+    def __init__(self, initially_visible: bool = True):
+        self.toggles: dict[int, bool] = {}
+        self.initially_visible = initially_visible
+
+    @classmethod
+    def from_fcurve(cls, fcurve: bpy.types.FCurve) -> "VisibilitySchedule":
+        """
+        Reconstructs a schedule from a `hide_viewport` or `hide_render` F-curve.
+        """
+        frames, hidden = read_keyframes(fcurve)
+        schedule = cls()
+        if len(frames) == 0:
+            return schedule
+        schedule.initially_visible = not hidden[0]
+        for i in range(1, len(frames)):
+            if hidden[i] != hidden[i - 1]:
+                schedule.toggle(int(round(frames[i])), not hidden[i])
+        return schedule
+
+    def toggle(self, frame: int, is_visible: bool):
+        """
+        Makes the object visible or invisible from a frame onwards.
+        """
+        self.toggles[frame] = is_visible
+
+    def update(self, other: "VisibilitySchedule"):
+        """
+        Applies all toggles of another schedule after the toggles of this schedule.
+        """
+        self.toggles.update(other.toggles)
+
+    def intervals(self) -> list[tuple[float, float]]:
+        """
+        Returns the merged intervals during which the object is visible, as sorted
+        `(start, end)` pairs. Each interval includes its start frame and excludes its end frame, and
+        unbounded intervals start at `-inf` or end at `inf`.
+        """
+        frames = sorted(self.toggles)
+        if frames:
+            visible = not self.toggles[frames[0]]
+        else:
+            visible = self.initially_visible
+
+        intervals: list[tuple[float, float]] = []
+        start = float("-inf")
+        for frame in frames:
+            if self.toggles[frame] == visible:
+                continue
+            visible = self.toggles[frame]
+            if visible:
+                start = frame
+            else:
+                intervals.append((start, frame))
+        if visible:
+            intervals.append((start, float("inf")))
+        return intervals
+
+    def compile(self) -> tuple[list[int], list[bool]]:
+        """
+        Compiles the schedule into the minimal set of constant keyframes.
+
+        Returns: The frame of each keyframe, and whether the object is visible from that frame
+        """
+        changes: list[tuple[int, bool]] = []
+        for start, end in self.intervals():
+            if start != float("-inf"):
+                changes.append((int(start), True))
+            if end != float("inf"):
+                changes.append((int(end), False))
+        if not changes:
+            return [0], [self.initially_visible]
+
+        # Before its first change, the object is in the opposite state
+        first_frame, first_visible = changes[0]
+        frames = [first_frame - 1] + [frame for frame, _ in changes]
+        visible = [not first_visible] + [is_visible for _, is_visible in changes]
+        return frames, visible
+
+
+class VisibilityTrack:
+    """
+    Visibility toggles collected for an object until the enclosing batch is flushed.
+    """
+
+    def __init__(self, obj: Object):
+        self.obj = obj
+        self.schedule = VisibilitySchedule()
+
+    def flush(self):
+        """
+        Merges the collected toggles with the object's existing visibility keyframes, then rewrites
+        its visibility F-curves from the compiled schedule, see `_visibility_paths`.
+        """
+        data_paths = _visibility_paths(self.obj)
+        fcurve = find_fcurve(self.obj, data_paths[-1])
+        if fcurve is not None:
+            schedule = VisibilitySchedule.from_fcurve(fcurve)
+            schedule.update(self.schedule)
+        else:
+            schedule = self.schedule
+
+        frames, visible = schedule.compile()
+        hidden = [float(not is_visible) for is_visible in visible]
+        for data_path in data_paths:
+            write_keyframes(
+                get_or_create_fcurve(self.obj, data_path),
+                frames,
+                hidden,
+                interpolation="CONSTANT",
+                replace=True,
+            )
+        self.schedule = VisibilitySchedule()
+
+
+def _visibility_paths(obj: Object) -> tuple[str, ...]:
+    """
+    Returns the paths of the properties that hold the visibility animation of an object: its own
+    hidden property if it is in a visibility group, otherwise `hide_viewport` and `hide_render`.
+    """
+    if "mg_visibility_groups" in obj:
+        return (f'["{OWN_HIDDEN_PROPERTY}"]',)
+    return ("hide_viewport", "hide_render")
 
 
 def show_at(arg: ObjectArg, frame: int, children: bool = True):
@@ -86,8 +293,9 @@ def show_now(arg: Optional[ObjectsArg] = None, children: bool = True):
       `True`
     """
     objs = resolve_objects(arg) if arg is not None else selections()
-    for obj in objs:
-        show_at(obj, current_frame(), children)
+    toggle_objects_visibility(
+        cast(list[ObjectArg], objs), current_frame(), True, children
+    )
 
 
 def hide_now(arg: Optional[ObjectsArg] = None, children: bool = True):
@@ -101,107 +309,288 @@ def hide_now(arg: Optional[ObjectsArg] = None, children: bool = True):
       `True`
     """
     objs = resolve_objects(arg) if arg is not None else selections()
-    for obj in objs:
-        hide_at(obj, current_frame(), children)
+    toggle_objects_visibility(
+        cast(list[ObjectArg], objs), current_frame(), False, children
+    )
+
+
+def create_visibility_group(
+    name: str,
+    objects: Optional[ObjectsArg] = None,
+    parent: Optional[CollectionArg] = None,
+) -> bpy.types.Collection:
+    """
+    Creates a collection whose objects appear and disappear together.
+
+    The visibility of a group is animated with `show_group_at` and `hide_group_at`, which keyframe
+    a single controller object rather than every object in the group. Any existing collection can
+    also be used as a group.
+
+    Arguments:
+
+    - `name`: The name of the collection
+
+    Optional arguments:
+
+    - `objects`: Objects to link to the collection
+    - `parent`: Collection in which to create the group, defaults to the scene collection
+
+    Returns: The created collection
+    """
+    coll = create_collection(name, link=False)
+    resolve_collection(parent).children.link(coll)
+    if objects is not None:
+        for obj in resolve_objects(objects):
+            coll.objects.link(obj)
+    update_visibility_group(coll)
+    return coll
+
+
+def update_visibility_group(arg: CollectionArg):
+    """
+    Makes the objects of a visibility group follow the group's visibility. This is done when the
+    group is created, and needs to be done again after objects are added to the group.
+
+    Objects in nested groups are visible only while all of their groups are visible. Objects
+    also keep their own visibility animation: it is moved to their `mg_hidden` property when they
+    join their first group, and later `show_at` and `hide_at` calls animate that property. Raises
+    an exception if an object that isn't in a group yet has drivers on its visibility.
+
+    Arguments:
+
+    - `arg`: The collection of the group
+    """
+    coll = resolve_collection(arg)
+    _get_or_create_group_controller(coll)
+    joining = [
+        obj
+        for obj in coll.all_objects
+        if "mg_visibility_controls" not in obj and "mg_visibility_groups" not in obj
+    ]
+    for obj in joining:
+        anim = obj.animation_data
+        for data_path in ("hide_viewport", "hide_render"):
+            if anim is not None and anim.drivers.find(data_path) is not None:
+                raise Exception(
+                    f"{obj.name} has a driver on {data_path}, so it can't join a visibility "
+                    "group"
+                )
+    for obj in joining:
+        _move_own_visibility(obj)
+
+    for obj in coll.all_objects:
+        if "mg_visibility_controls" in obj:
+            continue
+        # Names of the groups of the object, as JSON since ID properties can't hold string lists
+        groups: list[str] = json.loads(cast(str, obj.get("mg_visibility_groups", "[]")))
+        if coll.name not in groups:
+            groups.append(coll.name)
+            obj["mg_visibility_groups"] = json.dumps(groups)
+            _drive_visibility(obj, groups)
+    coll["mg_visibility_drivers"] = True
+
+
+def _move_own_visibility(obj: Object):
+    """
+    Moves the visibility of an object joining its first visibility group, including its
+    `hide_render` keyframes, to its own hidden property.
+    """
+    obj[OWN_HIDDEN_PROPERTY] = float(obj.hide_render)
+    fcurve = find_fcurve(obj, "hide_render")
+    if fcurve is not None:
+        frames, hidden = read_keyframes(fcurve)
+        write_keyframes(
+            get_or_create_fcurve(obj, f'["{OWN_HIDDEN_PROPERTY}"]'),
+            frames.tolist(),
+            hidden.tolist(),
+            interpolation="CONSTANT",
+            replace=True,
+        )
+    for data_path in ("hide_viewport", "hide_render"):
+        remove_fcurve(obj, data_path)
+
+
+def show_group_at(arg: CollectionArg, frame: int):
+    """
+    Animates all objects in a collection to appear at frame `frame`.
+
+    Objects in the collection and its child collections are visible while the group is visible,
+    unless their own visibility animation hides them.
+
+    Arguments:
+
+    - `arg`: Collection to make visible
+    - `frame`: Frame at which the collection should be shown
+    """
+    toggle_group_visibility(arg, frame, True)
+
+
+def hide_group_at(arg: CollectionArg, frame: int):
+    """
+    Animates all objects in a collection to disappear at frame `frame`.
+
+    Objects in the collection and its child collections are visible while the group is visible,
+    unless their own visibility animation hides them.
+
+    Arguments:
+
+    - `arg`: Collection to hide
+    - `frame`: Frame at which the collection should be hidden
+    """
+    toggle_group_visibility(arg, frame, False)
+
+
+def toggle_group_visibility(arg: CollectionArg, frame: int, is_visible: bool):
+    """
+    Sets a frame at which all objects in a collection should become visible or invisible.
+
+    Only the group's controller object is keyframed. Objects in the collection follow it through
+    drivers, which are added when the group is created, see `update_visibility_group`.
+
+    Arguments:
+
+    - `arg`: Collection to make visible or invisible
+    - `frame`: Frame at which the visibility should be updated
+    - `is_visible`: `True` if the collection should become visible, `False` if it should become
+      invisible
+    """
+    coll = resolve_collection(arg)
+    # Collections that weren't created as groups get their drivers the first time
+    if not coll.get("mg_visibility_drivers"):
+        update_visibility_group(coll)
+    controller = _get_or_create_group_controller(coll)
+    toggle_objects_visibility(controller, frame, is_visible, children=False)
+
+
+def _get_or_create_group_controller(coll: bpy.types.Collection) -> Object:
+    """
+    Returns the empty object whose visibility controls a visibility group, creating it if needed.
+    """
+    controller = coll.get("mg_visibility_controller")
+    if controller is not None:
+        return controller
+    controller = bpy.data.objects.new(f"{coll.name}_Visibility", None)
+    coll.objects.link(controller)
+    coll["mg_visibility_controller"] = controller
+    # Controllers of nested groups are not driven by the groups containing them
+    controller["mg_visibility_controls"] = coll.name
+    return controller
+
+
+def _drive_visibility(obj: Object, groups: list[str]):
+    """
+    Adds drivers that hide an object whenever its own hidden property is set, or the controller
+    of any of its groups is hidden.
+    """
+    controllers = [
+        _get_or_create_group_controller(bpy.data.collections[name]) for name in groups
+    ]
+    names = [f"hidden_{i}" for i in range(len(controllers))]
+    expression = f"max(hidden, {', '.join(names)})"
+    for data_path in ("hide_viewport", "hide_render"):
+        obj.driver_remove(data_path)
+        fcurve = cast(bpy.types.FCurve, obj.driver_add(data_path))
+        driver = cast(bpy.types.Driver, fcurve.driver)
+        driver.type = "SCRIPTED"
+        driver.expression = expression
+        own = driver.variables.new()
+        own.name = "hidden"
+        own.type = "SINGLE_PROP"
+        own.targets[0].id_type = "OBJECT"
+        own.targets[0].id = obj
+        own.targets[0].data_path = f'["{OWN_HIDDEN_PROPERTY}"]'
+        for name, controller in zip(names, controllers):
+            variable = driver.variables.new()
+            variable.name = name
+            variable.type = "SINGLE_PROP"
+            variable.targets[0].id_type = "OBJECT"
+            variable.targets[0].id = controller
+            variable.targets[0].data_path = data_path
 
 
 def pop_in(
     args: Optional[ObjectsArg] = None,
     frame: Optional[int] = None,
-    duration: int = 15,
+    duration: Union[int, Sequence[int]] = 15,
     delay: Optional[int] = None,
+    easing: EasingPreset = "smooth",
 ):
     """
     Animates an object growing into place.
 
+    Start and end frames for all objects are computed at once, and every scale and visibility
+    F-curve is written in a single batch.
+
     Optional arguments:
 
     - `args`: Objects to animate, defaults to selected objects
     - `frame`: Frame at which animation should start, defaults to current frame
-    - `duration`: Length of animation in frames, defaults to 15 frames
+    - `duration`: Length of animation in frames, or one length per object; defaults to 15 frames
     - `delay`: Amount of time between animations, if multiple objects; defaults to 0
+    - `easing`: Easing preset for the animation, defaults to "smooth"
     """
-    # Use current frame as default frame
-    if frame is None:
-        frame = current_frame()
-
-    # Use selected objects as default
-    if args is None:
-        args = cast(list[ObjectArg], selections())
-
-    # If we have a list of objects, animate each with a delay
-    if isinstance(args, list):
-        for i, arg in enumerate(args):
-            if delay is not None:
-                f = frame + i * delay
-            else:
-                f = frame
-            pop_in(arg, frame=f, duration=duration)
-        return
-
-    # We know we have a single object now, so resolve it
-    obj = resolve_object(cast(ObjectArg, args))
-
-    # Animate starting position
-    show_at(obj, frame)
-    obj.scale[0] = 0
-    obj.scale[1] = 0
-    obj.scale[2] = 0
-    obj.keyframe_insert("scale", frame=frame)
-
-    # Animate end position
-    obj.scale[0] = 1
-    obj.scale[1] = 1
-    obj.scale[2] = 1
-    obj.keyframe_insert("scale", frame=frame + duration)
+    objs = resolve_objects(args) if args is not None else selections()
+    starts, ends = stagger_frames(
+        len(objs), frame if frame is not None else current_frame(), duration, delay
+    )
+    with batch():
+        toggle_objects_visibility(cast(list[ObjectArg], objs), starts, True)
+        _animate_scale(objs, starts, ends, 0, 1, easing)
 
 
 def pop_out(
     args: Optional[ObjectsArg] = None,
     frame: Optional[int] = None,
-    duration: int = 15,
+    duration: Union[int, Sequence[int]] = 15,
     delay: Optional[int] = None,
+    easing: EasingPreset = "smooth",
 ):
     """
     Animates an object shrinking and disappearing.
 
+    Start and end frames for all objects are computed at once, and every scale and visibility
+    F-curve is written in a single batch.
+
     Optional arguments:
 
     - `args`: Objects to animate, defaults to selected objects
     - `frame`: Frame at which animation should start, defaults to current frame
-    - `duration`: Length of animation in frames, defaults to 15 frames
+    - `duration`: Length of animation in frames, or one length per object; defaults to 15 frames
     - `delay`: Amount of time between animations, if multiple objects; defaults to 0
+    - `easing`: Easing preset for the animation, defaults to "smooth"
     """
-    # Use current frame as default frame
-    if frame is None:
-        frame = current_frame()
-
-    # Use selected objects as default
-    if args is None:
-        args = cast(list[ObjectArg], selections())
-
-    # If we have a list of objects, animate each with a delay
-    if isinstance(args, list):
-        for i, arg in enumerate(args):
-            if delay is not None:
-                f = frame + i * delay
-            else:
-                f = frame
-            pop_out(arg, frame=f, duration=duration)
-        return
-
-    # We know we have a single object now, so resolve it
-    obj = resolve_object(args)
-
-    # Animate starting position
-    obj.scale[0] = 1
-    obj.scale[1] = 1
-    obj.scale[2] = 1
-    obj.keyframe_insert("scale", frame=frame)
-
-    # Animate end position
-    obj.scale[0] = 0
-    obj.scale[1] = 0
-    obj.scale[2] = 0
-    obj.keyframe_insert("scale", frame=frame + duration)
-    hide_at(obj, frame + duration)
+    objs = resolve_objects(args) if args is not None else selections()
+    starts, ends = stagger_frames(
+        len(objs), frame if frame is not None else current_frame(), duration, delay
+    )
+    with batch():
+        _animate_scale(objs, starts, ends, 1, 0, easing)
+        toggle_objects_visibility(cast(list[ObjectArg], objs), ends, False)
+
+
+def _animate_scale(
+    objs: list[Object],
+    starts: list[int],
+    ends: list[int],
+    start_scale: float,
+    end_scale: float,
+    easing: EasingPreset,
+):
+    """
+    Animates the uniform scale of each object between its start and end frames, and leaves each
+    object at its end scale.
+    """
+    interpolation, easing_mode = EASING_PRESETS[easing]
+    with batch():
+        for obj, start, end in zip(objs, starts, ends):
+            obj.scale = (end_scale, end_scale, end_scale)
+            for i in range(3):
+                insert_keyframes(
+                    obj,
+                    "scale",
+                    [start, end],
+                    [start_scale, end_scale],
+                    index=i,
+                    interpolation=interpolation,
+                    easing=easing_mode,
+                )
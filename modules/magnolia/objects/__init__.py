@@ -3,6 +3,7 @@ __all__ = [
     "geonodes",
     "location",
     "material",
+    "merge",
     "mesh",
     "modifier",
     "object",
@@ -12,6 +13,7 @@ from .constraint import *
 from .geonodes import *
 from .location import *
 from .material import *
+from .merge import *
 from .mesh import *
 from .modifier import *
 from .object import *
@@ -1,7 +1,12 @@
-from typing import cast, TypedDict, Union
+import hashlib
+import json
+import numbers
+
+from typing import cast, Literal, Optional, TypedDict, Union
 
 import bpy
 
+from ..scene.names import lookup_id, PropertyIndex
 from .object import ObjectArg, resolve_object
 
 
@@ -35,12 +40,23 @@ def resolve_material(arg: MaterialArg) -> bpy.types.Material:
     """
     if isinstance(arg, bpy.types.Material):
         return arg
-    return bpy.data.materials[arg]
+    return cast(bpy.types.Material, lookup_id("materials", arg))
 
 
 def assign_material(arg: ObjectArg, material: bpy.types.Material):
     obj = resolve_object(arg)
     mesh = cast(bpy.types.Mesh, obj.data)
+
+    # Meshes from the mesh cache may be shared, so the material is linked to the object instead
+    slots = obj.material_slots
+    if "mg_mesh_hash" in mesh or (len(slots) > 0 and slots[0].link == "OBJECT"):
+        if not mesh.materials:
+            mesh.materials.append(None)
+        slot = obj.material_slots[0]
+        slot.link = "OBJECT"
+        slot.material = material
+        return
+
     if mesh.materials:
         mesh.materials[0] = material
     else:
@@ -58,6 +74,7 @@ def create_bsdf_material(
     for key, value in config.items():
         bsdf.inputs[key].default_value = value  # pyright: ignore
     material.shadow_method = shadow  # pyright: ignore
+    _cache_material(material, _bsdf_config_hash(config, shadow))
     return material
 
 
@@ -134,6 +151,92 @@ def create_emission_material(
         # Set blend mode of material to alpha blend
         material.blend_method = "BLEND"
 
+    _cache_material(material, _emission_config_hash(color, shadow, opacity_control))
+    return material
+
+
+def create_attribute_emission_material(
+    name: str,
+    attribute_type: Literal["OBJECT", "INSTANCER"] = "INSTANCER",
+    shadow: str = "NONE",  # "OPAQUE" or "NONE"
+) -> bpy.types.Material:
+    """
+    Creates a new emission material whose color and opacity come from attributes.
+
+    The color is read from the `mg_color` attribute and the opacity from the `mg_opacity`
+    attribute. With "INSTANCER" attributes, every instance drawn by an object can have its own
+    color and opacity, which are multiplied by the `mg_opacity` property of the object.
+
+    Arguments:
+
+    - `name`: The name of the material.
+
+    Optional arguments:
+
+    - `attribute_type`: Where the attributes are read from, either "OBJECT" or "INSTANCER".
+      Defaults to "INSTANCER".
+    - `shadow`: The shadow method of the material. Defaults to "NONE".
+    """
+    material = bpy.data.materials.new(name=name)
+    material.use_nodes = True
+    material.shadow_method = shadow  # pyright: ignore
+    material.blend_method = "BLEND"
+
+    node_tree = cast(bpy.types.ShaderNodeTree, material.node_tree)
+    node_tree.nodes.remove(node_tree.nodes["Principled BSDF"])
+
+    # Emission with the color of the `mg_color` attribute
+    color_node = cast(
+        bpy.types.ShaderNodeAttribute, node_tree.nodes.new("ShaderNodeAttribute")
+    )
+    color_node.attribute_name = "mg_color"
+    color_node.attribute_type = attribute_type
+    color_node.location = (-600, -100)
+    emission_node = node_tree.nodes.new("ShaderNodeEmission")
+    emission_node.location = (-300, -100)
+    color_output = color_node.outputs["Color"]  # pyright: ignore
+    node_tree.links.new(color_output, emission_node.inputs["Color"])
+
+    # Opacity of the `mg_opacity` attribute
+    opacity_node = cast(
+        bpy.types.ShaderNodeAttribute, node_tree.nodes.new("ShaderNodeAttribute")
+    )
+    opacity_node.attribute_name = "mg_opacity"
+    opacity_node.attribute_type = attribute_type
+    opacity_node.location = (-600, 200)
+    opacity_output = opacity_node.outputs["Fac"]  # pyright: ignore
+    if attribute_type == "INSTANCER":
+        # Combine the opacity of each instance with the opacity of the whole object
+        object_opacity_node = cast(
+            bpy.types.ShaderNodeAttribute, node_tree.nodes.new("ShaderNodeAttribute")
+        )
+        object_opacity_node.attribute_name = "mg_opacity"
+        object_opacity_node.attribute_type = "OBJECT"
+        object_opacity_node.location = (-600, 400)
+        multiply_node = cast(
+            bpy.types.ShaderNodeMath, node_tree.nodes.new("ShaderNodeMath")
+        )
+        multiply_node.operation = "MULTIPLY"
+        multiply_node.location = (-300, 300)
+        object_opacity = object_opacity_node.outputs["Fac"]  # pyright: ignore
+        node_tree.links.new(opacity_output, multiply_node.inputs[0])  # pyright: ignore
+        node_tree.links.new(object_opacity, multiply_node.inputs[1])  # pyright: ignore
+        opacity_output = multiply_node.outputs["Value"]  # pyright: ignore
+
+    # Mix between transparent and emission based on opacity
+    transparent_node = node_tree.nodes.new("ShaderNodeBsdfTransparent")
+    transparent_node.location = (-300, 0)
+    mix_node = node_tree.nodes.new("ShaderNodeMixShader")
+    mix_node.location = (100, 100)
+    node_tree.links.new(opacity_output, mix_node.inputs[0])
+    node_tree.links.new(transparent_node.outputs["BSDF"], mix_node.inputs[1])
+    node_tree.links.new(emission_node.outputs["Emission"], mix_node.inputs[2])
+    node_tree.links.new(
+        mix_node.outputs["Shader"],
+        node_tree.nodes["Material Output"].inputs["Surface"],
+    )
+
+    _cache_material(material, _attribute_emission_config_hash(attribute_type, shadow))
     return material
 
 
@@ -143,9 +246,12 @@ def get_or_create_bsdf_material(
     shadow: str = "OPAQUE",
 ) -> bpy.types.Material:
     """
-    Gets an existing material or creates it from a configuration if needed.
+    Gets an existing material with the same configuration, or creates it if needed.
+
+    Materials are looked up by a hash of their configuration, see `get_cached_material`. The name
+    is only used for a new material.
     """
-    material = bpy.data.materials.get(name)
+    material = get_cached_material(_bsdf_config_hash(config, shadow))
     if material is not None:
         return material
     return create_bsdf_material(name, config, shadow=shadow)
@@ -158,7 +264,10 @@ def get_or_create_emission_material(
     opacity_control: bool = False,
 ) -> bpy.types.Material:
     """
-    Gets an existing material or creates it from a configuration if needed.
+    Gets an existing material with the same configuration, or creates it if needed.
+
+    Materials are looked up by a hash of their configuration, see `get_cached_material`. The name
+    is only used for a new material.
 
     Arguments:
 
@@ -171,9 +280,146 @@ def get_or_create_emission_material(
     - `opacity_control`: Whether to add opacity controls to the material.
       Defaults to False.
     """
-    material = bpy.data.materials.get(name)
+    material = get_cached_material(
+        _emission_config_hash(color, shadow, opacity_control)
+    )
     if material is not None:
         return material
     return create_emission_material(
         name, color, shadow=shadow, opacity_control=opacity_control
     )
+
+
+def get_or_create_attribute_emission_material(
+    name: str,
+    attribute_type: Literal["OBJECT", "INSTANCER"] = "INSTANCER",
+    shadow: str = "NONE",  # "OPAQUE" or "NONE"
+) -> bpy.types.Material:
+    """
+    Gets an existing attribute emission material with the same configuration, or creates it if
+    needed. See `create_attribute_emission_material`.
+    """
+    material = get_cached_material(
+        _attribute_emission_config_hash(attribute_type, shadow)
+    )
+    if material is not None:
+        return material
+    return create_attribute_emission_material(
+        name, attribute_type=attribute_type, shadow=shadow
+    )
+
+
+_material_cache = PropertyIndex("materials", "mg_config_hash")
+
+
+def material_config_hash(kind: str, config: dict) -> str:
+    """
+    Returns a hash of a material configuration, which is the same for equal configurations
+    regardless of key order, tuple or list types, or tiny floating point differences.
+
+    Arguments:
+
+    - `kind`: The kind of material, such as "emission"
+    - `config`: The configuration of the material
+
+    Returns: The hash, as a hex string
+    """
+    canonical = json.dumps([kind, _canonical(config)], sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def get_cached_material(key: str) -> Optional[bpy.types.Material]:
+    """
+    Returns the material with a configuration hash, if there is one.
+
+    The hash of a material's configuration is stored in its `mg_config_hash` property, so
+    materials created by earlier runs of a script are found as well.
+
+    Arguments:
+
+    - `key`: The configuration hash, see `material_config_hash`
+
+    Returns: The material, or `None`
+    """
+    return cast(Optional[bpy.types.Material], _material_cache.lookup(key))
+
+
+def merge_duplicate_materials() -> int:
+    """
+    Replaces materials that have the same configuration hash with a single material, and removes
+    the duplicates.
+
+    Returns: The number of removed materials
+    """
+    kept: dict[str, bpy.types.Material] = {}
+    duplicates: list[tuple[bpy.types.Material, bpy.types.Material]] = []
+    for material in bpy.data.materials:
+        key = material.get("mg_config_hash")
+        if key is None:
+            continue
+        if key in kept:
+            duplicates.append((material, kept[key]))
+        else:
+            kept[key] = material
+
+    for duplicate, material in duplicates:
+        duplicate.user_remap(material)
+        bpy.data.materials.remove(duplicate)
+    _material_cache.rebuild()
+    return len(duplicates)
+
+
+def _cache_material(material: bpy.types.Material, key: str):
+    """
+    Stores the configuration hash on a new material and adds it to the material cache.
+    """
+    _material_cache.add(material, key)
+
+
+def _canonical(value):
+    """
+    Converts a configuration value to a canonical form for hashing. Numbers, including NumPy
+    scalars, become rounded floats, so that equal values of different types hash the same.
+    """
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if hasattr(value, "tolist"):
+        # NumPy arrays and scalars
+        return _canonical(value.tolist())
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return round(float(value), 6)
+    return value
+
+
+def _bsdf_config_hash(config: PrincipledBSDFMaterialConfig, shadow: str) -> str:
+    """
+    Returns the configuration hash of a Principled BSDF material.
+    """
+    return material_config_hash("bsdf", {"inputs": dict(config), "shadow": shadow})
+
+
+def _emission_config_hash(
+    color: Union[tuple[float, float, float], tuple[float, float, float, float]],
+    shadow: str,
+    opacity_control: bool,
+) -> str:
+    """
+    Returns the configuration hash of an emission material.
+    """
+    if len(color) == 3:
+        color = (*color, 1)
+    return material_config_hash(
+        "emission",
+        {"color": color, "shadow": shadow, "opacity_control": opacity_control},
+    )
+
+
+def _attribute_emission_config_hash(attribute_type: str, shadow: str) -> str:
+    """
+    Returns the configuration hash of an attribute emission material.
+    """
+    return material_config_hash(
+        "attribute_emission", {"attribute_type": attribute_type, "shadow": shadow}
+    )
@@ -0,0 +1,328 @@
+import json
+
+from typing import cast, Optional, Union
+
+import bpy
+import mathutils
+import numpy as np
+
+from bpy.types import Object
+
+from ..scene import CollectionArg, resolve_collection
+from .mesh import create_mesh, mesh_to_arrays, MeshArrays
+from .object import ObjectArg, ObjectsArg, resolve_object, resolve_objects
+
+# Object properties read by materials, which are kept on merged objects and their parts
+MERGED_PROPERTIES = ("mg_opacity", "mg_color")
+
+
+def merge_static(
+    objects: ObjectsArg,
+    name: str = "Static",
+    collection: Optional[CollectionArg] = None,
+    remove: bool = True,
+) -> list[Object]:
+    """
+    Joins objects that never move into a single mesh, to reduce the number of objects Blender has
+    to evaluate, draw and render.
+
+    Every face keeps its material through per-face material indices, and records the object it
+    came from in the `mg_part_id` face attribute. Use `extract_part` to turn a part back into its
+    own object, such as when it needs to be animated.
+
+    Objects are grouped by their `mg_opacity` and `mg_color` properties, with one merged object
+    per distinct combination, so that materials reading these properties keep working. Objects
+    that are not meshes, are animated, are hidden or have children are not merged.
+
+    Arguments:
+
+    - `objects`: Objects to merge
+
+    Optional arguments:
+
+    - `name`: Name of the merged objects, defaults to "Static"
+    - `collection`: The collection to link the merged objects to
+    - `remove`: Whether to remove the original objects, defaults to `True`
+
+    Returns: The merged objects
+    """
+    groups: dict[tuple, list[Object]] = {}
+    for obj in resolve_objects(objects):
+        if obj.type != "MESH" or obj.animation_data is not None or obj.children:
+            continue
+        # Hidden objects would start rendering as part of a visible merged object
+        if obj.hide_render or obj.hide_viewport:
+            continue
+        key = tuple(_get_property(obj, name) for name in MERGED_PROPERTIES)
+        groups.setdefault(key, []).append(obj)
+
+    # Objects with modifiers are merged as they appear, using one depsgraph update
+    depsgraph = None
+    if any(obj.modifiers for group in groups.values() for obj in group):
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    coll = resolve_collection(collection)
+    merged = []
+    for key, group in groups.items():
+        obj = _merge_objects(group, name, depsgraph)
+        coll.objects.link(obj)
+        for property_name, value in zip(MERGED_PROPERTIES, key):
+            if value is not None:
+                obj[property_name] = value
+        merged.append(obj)
+
+    if remove:
+        for group in groups.values():
+            for obj in group:
+                bpy.data.objects.remove(obj)
+    return merged
+
+
+def extract_part(
+    arg: ObjectArg,
+    part: Union[int, str],
+    collection: Optional[CollectionArg] = None,
+) -> Object:
+    """
+    Separates a part of an object created by `merge_static` into its own object again, with its
+    original name, transform, materials, opacity and color.
+
+    Arguments:
+
+    - `arg`: The merged object
+    - `part`: The part id of the part, or the name of the original object
+
+    Optional arguments:
+
+    - `collection`: The collection to link the new object to, defaults to the collection of the
+      merged object
+
+    Returns: The object of the part
+
+    Raises a `KeyError` if the object has no such part.
+    """
+    merged = resolve_object(arg)
+    parts: dict[str, dict] = json.loads(cast(str, merged["mg_parts"]))
+    if isinstance(part, str):
+        key = next((key for key, info in parts.items() if info["name"] == part), None)
+    else:
+        key = str(part)
+    if key is None or key not in parts:
+        raise KeyError(f"{merged.name} has no part {part}")
+    info = parts.pop(key)
+
+    mesh = cast(bpy.types.Mesh, merged.data)
+    arrays = mesh_to_arrays(mesh)
+    face_materials, face_smooth, face_parts = _read_face_data(mesh)
+    in_part = face_parts == int(key)
+
+    # Vertices of the merged mesh are in the space of the merged object
+    matrix = np.array(info["matrix"], dtype=np.float64).reshape(4, 4)
+    part_arrays, part_faces = _submesh(arrays, in_part)
+    vertices = np.c_[part_arrays.vertices, np.ones(len(part_arrays.vertices))]
+    part_arrays = part_arrays._replace(
+        vertices=(vertices @ np.linalg.inv(matrix).T)[:, :3]
+    )
+
+    # Only keep the materials the part uses
+    used, part_materials = np.unique(face_materials[part_faces], return_inverse=True)
+    materials = [mesh.materials[int(index)] for index in used]
+    part_mesh = _build_mesh(
+        info["name"],
+        part_arrays,
+        materials,
+        part_materials,
+        face_smooth[part_faces],
+    )
+    obj = bpy.data.objects.new(info["name"], part_mesh)
+    obj.matrix_world = merged.matrix_world @ mathutils.Matrix(matrix.tolist())
+    for property_name in MERGED_PROPERTIES:
+        if info.get(property_name) is not None:
+            obj[property_name] = info[property_name]
+    if collection is not None:
+        resolve_collection(collection).objects.link(obj)
+    else:
+        for coll in merged.users_collection:
+            coll.objects.link(obj)
+
+    # Remove the part from the merged object
+    if not parts:
+        bpy.data.objects.remove(merged)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+        return obj
+    rest_arrays, rest_faces = _submesh(arrays, ~in_part)
+    rest_mesh = _build_mesh(
+        mesh.name,
+        rest_arrays,
+        list(mesh.materials),
+        face_materials[rest_faces],
+        face_smooth[rest_faces],
+        face_parts[rest_faces],
+    )
+    merged.data = rest_mesh
+    merged["mg_parts"] = json.dumps(parts)
+    if mesh.users == 0:
+        mesh_name = mesh.name
+        bpy.data.meshes.remove(mesh)
+        rest_mesh.name = mesh_name
+    return obj
+
+
+def _merge_objects(
+    objs: list[Object], name: str, depsgraph: Optional[bpy.types.Depsgraph]
+) -> Object:
+    """
+    Creates an object whose mesh joins the world-space meshes of the given objects.
+    """
+    vertices, edges, loops, loop_starts = [], [], [], []
+    face_materials, face_smooth, face_parts = [], [], []
+    materials: dict[Optional[bpy.types.Material], int] = {}
+    parts = {}
+    vertex_count = loop_count = 0
+
+    for part_id, obj in enumerate(objs):
+        if depsgraph is not None and obj.modifiers:
+            source = obj.evaluated_get(depsgraph)
+            try:
+                mesh = cast(bpy.types.Mesh, source.to_mesh())
+                arrays = mesh_to_arrays(mesh)
+                part_materials, part_smooth, _ = _read_face_data(mesh)
+            finally:
+                source.to_mesh_clear()
+        else:
+            source = obj
+            mesh = cast(bpy.types.Mesh, obj.data)
+            arrays = mesh_to_arrays(mesh)
+            part_materials, part_smooth, _ = _read_face_data(mesh)
+
+        # Map the material slots of the object to the slots of the merged mesh
+        slot_materials = [slot.material for slot in source.material_slots] or [None]
+        slot_map = np.array(
+            [
+                materials.setdefault(material, len(materials))
+                for material in slot_materials
+            ]
+        )
+        part_materials = slot_map[np.clip(part_materials, 0, len(slot_map) - 1)]
+
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        vertices.append(arrays.vertices @ matrix[:3, :3].T + matrix[:3, 3])
+        edges.append(arrays.edges + vertex_count)
+        loops.append(arrays.loops + vertex_count)
+        loop_starts.append(arrays.loop_starts + loop_count)
+        face_materials.append(part_materials)
+        face_smooth.append(part_smooth)
+        face_parts.append(np.full(len(arrays.loop_starts), part_id))
+        vertex_count += len(arrays.vertices)
+        loop_count += len(arrays.loops)
+
+        parts[str(part_id)] = {
+            "name": obj.name,
+            "matrix": matrix.ravel().tolist(),
+            **{name: _get_property(obj, name) for name in MERGED_PROPERTIES},
+        }
+
+    arrays = MeshArrays(
+        np.concatenate(vertices).reshape(-1, 3),
+        np.concatenate(edges).reshape(-1, 2),
+        np.concatenate(loops),
+        np.concatenate(loop_starts),
+    )
+    mesh = _build_mesh(
+        name,
+        arrays,
+        list(materials),
+        np.concatenate(face_materials),
+        np.concatenate(face_smooth),
+        np.concatenate(face_parts),
+    )
+    merged = bpy.data.objects.new(name, mesh)
+    merged["mg_parts"] = json.dumps(parts)
+    return merged
+
+
+def _read_face_data(mesh: bpy.types.Mesh) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reads the material index, smooth shading and part id of every face of a mesh. Part ids are
+    -1 if the mesh has no `mg_part_id` attribute.
+    """
+    face_count = len(mesh.polygons)
+    face_materials = np.empty(face_count, dtype=np.int32)
+    face_smooth = np.empty(face_count, dtype=bool)
+    face_parts = np.full(face_count, -1, dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", face_materials)
+    mesh.polygons.foreach_get("use_smooth", face_smooth)
+    attribute = mesh.attributes.get("mg_part_id")
+    if attribute is not None:
+        attribute.data.foreach_get("value", face_parts)  # pyright: ignore
+    return face_materials, face_smooth, face_parts
+
+
+def _submesh(
+    arrays: MeshArrays, face_mask: np.ndarray
+) -> tuple[MeshArrays, np.ndarray]:
+    """
+    Returns the mesh arrays of the selected faces, with only the vertices and edges they use,
+    and the indices of the selected faces.
+    """
+    vertices, edges, loops, loop_starts = arrays
+    face_sizes = np.diff(np.append(loop_starts, len(loops)))
+    loop_mask = np.repeat(face_mask, face_sizes)
+
+    vertex_mask = np.zeros(len(vertices), dtype=bool)
+    vertex_mask[loops[loop_mask]] = True
+    remap = np.cumsum(vertex_mask) - 1
+    edge_mask = vertex_mask[edges].all(axis=1)
+
+    sizes = face_sizes[face_mask]
+    return (
+        MeshArrays(
+            vertices[vertex_mask],
+            remap[edges[edge_mask]].reshape(-1, 2),
+            remap[loops[loop_mask]],
+            np.cumsum(sizes) - sizes,
+        ),
+        np.flatnonzero(face_mask),
+    )
+
+
+def _build_mesh(
+    name: str,
+    arrays: MeshArrays,
+    materials: list[Optional[bpy.types.Material]],
+    face_materials: np.ndarray,
+    face_smooth: np.ndarray,
+    face_parts: Optional[np.ndarray] = None,
+) -> bpy.types.Mesh:
+    """
+    Creates a mesh from mesh arrays with per-face materials, shading and part ids.
+    """
+    mesh = create_mesh(arrays, name)
+    for material in materials:
+        mesh.materials.append(material)
+    mesh.polygons.foreach_set(
+        "material_index", np.ascontiguousarray(face_materials, dtype=np.int32)
+    )
+    mesh.polygons.foreach_set(
+        "use_smooth", np.ascontiguousarray(face_smooth, dtype=bool)
+    )
+    if face_parts is not None:
+        attribute = mesh.attributes.new("mg_part_id", "INT", "FACE")
+        attribute.data.foreach_set(  # pyright: ignore
+            "value", np.ascontiguousarray(face_parts, dtype=np.int32)
+        )
+    mesh.update()
+    return mesh
+
+
+def _get_property(obj: Object, name: str) -> Union[float, tuple, None]:
+    """
+    Returns a number or array property of an object as a hashable value, or `None` if unset.
+    """
+    value = obj.get(name)
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return tuple(value)
@@ -1,10 +1,14 @@
-from typing import cast, Optional
+import hashlib
+
+from typing import cast, NamedTuple, Optional, Union
 
 import bpy
+import numpy as np
 
 from bpy.types import Object
 
 from ..scene import CollectionArg, resolve_collection, selection
+from ..scene.names import PropertyIndex
 from .object import ObjectArg, resolve_object
 
 
@@ -17,9 +21,34 @@ Edge = tuple[int, int]
 # A face is represented as a variable-length tuple of vertex indices
 Face = tuple[int, ...]
 
+
+class MeshArrays(NamedTuple):
+    """
+    Mesh data stored in NumPy arrays, for meshes too large to handle as lists of tuples.
+
+    Faces are stored as one flat array of vertex indices for every face corner (loop), together
+    with the index of each face's first loop.
+    """
+
+    vertices: np.ndarray
+    """Vertex positions, as a float array of shape (vertex count, 3)"""
+
+    edges: np.ndarray
+    """Edges, as an integer array of vertex index pairs with shape (edge count, 2)"""
+
+    loops: np.ndarray
+    """Vertex index of each face corner, as an integer array of shape (loop count,)"""
+
+    loop_starts: np.ndarray
+    """Index into `loops` of each face's first corner, as an integer array of shape (face count,)"""
+
+
 # Meshes contain data about their vertices, edges, and faces
 MeshData = tuple[list[Vertex], list[Edge], list[Face]]
 
+# Mesh data given either as lists or as arrays
+MeshDataOrArrays = Union[MeshData, MeshArrays]
+
 
 def object_to_mesh_data(arg: Optional[ObjectArg] = None) -> MeshData:
     """
@@ -44,31 +73,268 @@ def object_to_mesh_data(arg: Optional[ObjectArg] = None) -> MeshData:
     return vertices, edges, faces  # pyright: ignore
 
 
+def object_to_mesh_arrays(arg: Optional[ObjectArg] = None) -> MeshArrays:
+    """
+    Return the mesh data associated with an object as NumPy arrays.
+
+    Much faster than `object_to_mesh_data` for large meshes, since all data is read with
+    `foreach_get`.
+
+    Optional arguments:
+
+    - `arg`: The object whose mesh data should be returned. Defaults to current
+      selection.
+
+    Returns: The mesh arrays of the object
+    """
+    obj = resolve_object(arg or selection())
+    return mesh_to_arrays(cast(bpy.types.Mesh, obj.data))
+
+
+def mesh_to_arrays(mesh: bpy.types.Mesh) -> MeshArrays:
+    """
+    Return the data of a mesh as NumPy arrays, read with `foreach_get`.
+
+    Arguments:
+
+    - `mesh`: The mesh to read, which may also be an evaluated mesh
+
+    Returns: The mesh arrays of the mesh
+    """
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.vertices.foreach_get("co", vertices)
+    mesh.edges.foreach_get("vertices", edges)
+    mesh.loops.foreach_get("vertex_index", loops)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    return MeshArrays(vertices.reshape(-1, 3), edges.reshape(-1, 2), loops, loop_starts)
+
+
+def mesh_data_to_arrays(data: MeshDataOrArrays) -> MeshArrays:
+    """
+    Converts mesh data to mesh arrays.
+
+    Arguments:
+
+    - `data`: The mesh data to convert
+
+    Returns: The mesh arrays
+    """
+    if isinstance(data, MeshArrays):
+        return data
+    vertices, edges, faces = data
+    face_sizes = np.array([len(face) for face in faces], dtype=np.int32)
+    return MeshArrays(
+        np.array(vertices, dtype=np.float32).reshape(-1, 3),
+        np.array(edges, dtype=np.int32).reshape(-1, 2),
+        np.array([i for face in faces for i in face], dtype=np.int32),
+        (np.cumsum(face_sizes) - face_sizes).astype(np.int32),
+    )
+
+
+def mesh_arrays_to_data(arrays: MeshArrays) -> MeshData:
+    """
+    Converts mesh arrays to mesh data made of lists of tuples.
+
+    Arguments:
+
+    - `arrays`: The mesh arrays to convert
+
+    Returns: Lists of vertices, edges, and faces
+    """
+    vertices = [cast(Vertex, tuple(vertex)) for vertex in arrays.vertices.tolist()]
+    edges = [cast(Edge, tuple(edge)) for edge in arrays.edges.tolist()]
+    loops = arrays.loops.tolist()
+    starts = arrays.loop_starts.tolist()
+    ends = starts[1:] + [len(loops)]
+    faces = [tuple(loops[start:end]) for start, end in zip(starts, ends)]
+    return vertices, edges, faces
+
+
 def create_object_from_mesh_data(
-    data: MeshData,
+    data: MeshDataOrArrays,
     name: str,
     collection: Optional[CollectionArg] = None,
     shade_flat: bool = False,
+    cache: Optional[bool] = None,
 ) -> Object:
     """
     Converts mesh data to a new Blender object with that mesh.
 
     Arguments:
 
-    - `data`: The mesh data for the new object
+    - `data`: The mesh data for the new object. Mesh arrays are written directly with
+      `foreach_set`, which is much faster for large meshes.
     - `name`: The name for the new object
 
     Optional arguments:
 
     - `collection`: The collection to link the new object to
     - `shade_flat`: Whether to shade flat or smooth
+    - `cache`: Whether to share the mesh with other objects of identical geometry, see
+      `get_or_create_mesh`. Defaults to the setting of `use_mesh_cache`.
 
     Returns: The newly created object
     """
-    vertices, edges, faces = data
-    mesh = bpy.data.meshes.new(name)
-    mesh.from_pydata(vertices, edges, faces, shade_flat=shade_flat)
+    if cache if cache is not None else _mesh_cache_enabled:
+        mesh = get_or_create_mesh(data, name, shade_flat)
+    else:
+        mesh = create_mesh(data, name, shade_flat)
     obj = bpy.data.objects.new(name, mesh)
     coll = resolve_collection(collection)
     coll.objects.link(obj)
     return obj
+
+
+def create_mesh(
+    data: MeshDataOrArrays, name: str, shade_flat: bool = False
+) -> bpy.types.Mesh:
+    """
+    Creates a new mesh from mesh data.
+
+    Arguments:
+
+    - `data`: The mesh data for the new mesh
+    - `name`: The name for the new mesh
+
+    Optional arguments:
+
+    - `shade_flat`: Whether to shade flat or smooth
+
+    Returns: The newly created mesh
+    """
+    if isinstance(data, MeshArrays):
+        return _create_mesh_from_arrays(data, name, shade_flat)
+    vertices, edges, faces = data
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, edges, faces, shade_flat=shade_flat)
+    return mesh
+
+
+_mesh_cache_enabled = False
+_mesh_cache = PropertyIndex("meshes", "mg_mesh_hash")
+
+
+def use_mesh_cache(enabled: bool = True):
+    """
+    Sets whether newly created objects share meshes with identical geometry by default.
+
+    Optional arguments:
+
+    - `enabled`: Whether to share meshes, defaults to `True`
+    """
+    global _mesh_cache_enabled
+    _mesh_cache_enabled = enabled
+
+
+def mesh_data_hash(data: MeshDataOrArrays, shade_flat: bool = False) -> str:
+    """
+    Returns a hash of the geometry and shading of mesh data.
+
+    Arguments:
+
+    - `data`: The mesh data to hash
+
+    Optional arguments:
+
+    - `shade_flat`: Whether the mesh is shaded flat or smooth
+    """
+    arrays = mesh_data_to_arrays(data)
+    digest = hashlib.sha1(b"flat" if shade_flat else b"smooth")
+    for array, dtype in zip(arrays, (np.float32, np.int32, np.int32, np.int32)):
+        array = np.ascontiguousarray(array, dtype=dtype)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def get_or_create_mesh(
+    data: MeshDataOrArrays, name: str, shade_flat: bool = False
+) -> bpy.types.Mesh:
+    """
+    Gets a mesh with the given geometry, or creates it if there isn't one yet.
+
+    Meshes are looked up by a hash of their geometry, stored in the mesh's `mg_mesh_hash`
+    property, so objects with identical geometry share a single mesh. Before changing the geometry
+    of a shared mesh, call `ensure_unique_mesh` on the object to give it its own copy.
+
+    Arguments:
+
+    - `data`: The mesh data for the mesh
+    - `name`: The name for the mesh, if a new one is created
+
+    Optional arguments:
+
+    - `shade_flat`: Whether to shade flat or smooth
+
+    Returns: The shared mesh
+    """
+    key = mesh_data_hash(data, shade_flat)
+    mesh = _mesh_cache.lookup(key)
+    if mesh is not None:
+        return cast(bpy.types.Mesh, mesh)
+
+    mesh = create_mesh(data, name, shade_flat)
+    _mesh_cache.add(mesh, key)
+    return mesh
+
+
+def ensure_unique_mesh(arg: ObjectArg) -> bpy.types.Mesh:
+    """
+    Makes sure an object's mesh can be changed without affecting other objects.
+
+    If the mesh is shared with other objects, the object is given its own copy. The mesh is also
+    removed from the mesh cache, since its geometry is about to change.
+
+    Arguments:
+
+    - `arg`: The object whose mesh will be changed
+
+    Returns: The object's own mesh
+    """
+    obj = resolve_object(arg)
+    mesh = cast(bpy.types.Mesh, obj.data)
+    if mesh.users > 1:
+        mesh = cast(bpy.types.Mesh, mesh.copy())
+        obj.data = mesh
+    _mesh_cache.discard(mesh)
+
+    # Materials of shared meshes are linked to the object, so they move back to the mesh
+    for slot in obj.material_slots:
+        if slot.link == "OBJECT":
+            material = slot.material
+            slot.link = "DATA"
+            slot.material = material
+    return mesh
+
+
+def _create_mesh_from_arrays(
+    arrays: MeshArrays, name: str, shade_flat: bool = False
+) -> bpy.types.Mesh:
+    """
+    Creates a new mesh from mesh arrays.
+    """
+    vertices, edges, loops, loop_starts = arrays
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set(
+        "co", np.ascontiguousarray(vertices, dtype=np.float32).ravel()
+    )
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set(
+        "vertices", np.ascontiguousarray(edges, dtype=np.int32).ravel()
+    )
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", np.ascontiguousarray(loops, dtype=np.int32))
+    mesh.polygons.add(len(loop_starts))
+    mesh.polygons.foreach_set(
+        "loop_start", np.ascontiguousarray(loop_starts, dtype=np.int32)
+    )
+
+    # Compute edges of faces and the edge of each face corner
+    mesh.update(calc_edges=len(loop_starts) > 0, calc_edges_loose=len(edges) > 0)
+    if shade_flat:
+        mesh.shade_flat()
+    return mesh
@@ -1,10 +1,17 @@
-from typing import cast, Optional, Union
+import numbers
+import re
+
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from typing import cast, Iterator, Optional, Sequence, Union
 
 import bpy
+import mathutils
 
 from bpy.types import Object
 
 from magnolia.scene import CollectionArg, resolve_collection
+from magnolia.scene.names import lookup_id, name_index_enabled as _name_index_enabled
 
 
 ObjectArg = Union[str, Object]
@@ -24,6 +31,9 @@ Represents a scale. Could be a (x, y, z) scale tuple, or a single
 value x representing scale (x, x, x).
 """
 
+# Below this many names, looking up each name is faster than a pass over `bpy.data.objects`
+_BATCH_LOOKUP_THRESHOLD = 16
+
 
 def resolve_object(arg: ObjectArg) -> Object:
     """
@@ -37,7 +47,7 @@ def resolve_object(arg: ObjectArg) -> Object:
     """
     if isinstance(arg, Object):
         return arg
-    return bpy.data.objects[arg]
+    return cast(Object, lookup_id("objects", arg))
 
 
 def resolve_objects(args: ObjectsArg) -> list[Object]:
@@ -45,15 +55,41 @@ def resolve_objects(args: ObjectsArg) -> list[Object]:
     Given an object argument or a list of object arguments, returns a list of corresponding
     objects.
 
+    When many objects are given by name, they are all resolved with a single pass over
+    `bpy.data.objects` (or through the name index, if enabled). A few names are looked up one by
+    one instead, which is faster than a pass over a large file.
+
     Arguments:
 
     - `args`: An object argument, or a list of object arguments
 
     Returns: List of objects
     """
-    if isinstance(args, list):
+    if not isinstance(args, list):
+        return [resolve_object(args)]
+    names = [arg for arg in args if not isinstance(arg, Object)]
+    if len(names) < _BATCH_LOOKUP_THRESHOLD or _name_index_enabled():
         return [resolve_object(arg) for arg in args]
-    return [resolve_object(args)]
+
+    # Resolve all names at once
+    by_name = {obj.name: obj for obj in bpy.data.objects}
+    return [arg if isinstance(arg, Object) else by_name[arg] for arg in args]
+
+
+def find_objects(pattern: Union[str, re.Pattern[str]]) -> list[Object]:
+    """
+    Returns all objects whose names match a pattern, with a single pass over `bpy.data.objects`.
+
+    Arguments:
+
+    - `pattern`: A glob pattern such as `"Dot_*"`, or a compiled regular expression that must
+      match the whole name
+
+    Returns: List of matching objects, in `bpy.data` order
+    """
+    if isinstance(pattern, str):
+        return [obj for obj in bpy.data.objects if fnmatchcase(obj.name, pattern)]
+    return [obj for obj in bpy.data.objects if pattern.fullmatch(obj.name)]
 
 
 def resolve_scale(arg: ScaleArg) -> tuple[float, float, float]:
@@ -71,11 +107,104 @@ def resolve_scale(arg: ScaleArg) -> tuple[float, float, float]:
     return (arg, arg, arg)
 
 
+class HierarchyIndex:
+    """
+    Index from each object to its children.
+
+    Blender's `Object.children` scans every object in the file on each access, so walking a
+    hierarchy through it is quadratic. The index is built with a single pass over
+    `bpy.data.objects` instead.
+    """
+
+    def __init__(self):
+        self.object_count = len(bpy.data.objects)
+        self._children: dict[Object, list[Object]] = {}
+        for obj in bpy.data.objects:
+            if obj.parent is not None:
+                self._children.setdefault(obj.parent, []).append(obj)
+
+    def children(self, obj: Object) -> list[Object]:
+        """
+        Returns the direct children of an object.
+        """
+        return self._children.get(obj, [])
+
+    def descendants(self, obj: Object, include_self: bool = False) -> list[Object]:
+        """
+        Returns all descendants of an object, with each parent before its children.
+
+        Optional arguments:
+
+        - `include_self`: Whether to include the object itself first, defaults to `False`
+        """
+        result = [obj] if include_self else []
+        stack = list(reversed(self.children(obj)))
+        while stack:
+            current = stack.pop()
+            result.append(current)
+            stack.extend(reversed(self.children(current)))
+        return result
+
+    def is_stale(self) -> bool:
+        """
+        Returns whether objects have been added or removed since the index was built.
+        """
+        return self.object_count != len(bpy.data.objects)
+
+
+_hierarchy_index: Optional[HierarchyIndex] = None
+_hierarchy_scopes = 0
+
+
+@contextmanager
+def hierarchy_scope():
+    """
+    Shares one hierarchy index between all recursive helpers called inside a `with` block.
+
+    The index is rebuilt if objects are added or removed inside the block, but changes to
+    `Object.parent` made outside of Magnolia are not detected until the block ends.
+    """
+    global _hierarchy_index, _hierarchy_scopes
+    _hierarchy_scopes += 1
+    try:
+        yield
+    finally:
+        _hierarchy_scopes -= 1
+        if _hierarchy_scopes == 0:
+            _hierarchy_index = None
+
+
+def get_hierarchy_index() -> HierarchyIndex:
+    """
+    Returns an index of the object hierarchy.
+
+    Inside a `hierarchy_scope()` block, the same index is reused until it becomes stale. Otherwise,
+    a new index is built.
+    """
+    global _hierarchy_index
+    if _hierarchy_scopes == 0:
+        return HierarchyIndex()
+    if _hierarchy_index is None or _hierarchy_index.is_stale():
+        _hierarchy_index = HierarchyIndex()
+    return _hierarchy_index
+
+
+def invalidate_hierarchy_index():
+    """
+    Discards the hierarchy index shared by the current `hierarchy_scope()` block.
+
+    Call this after reparenting objects inside a scope.
+    """
+    global _hierarchy_index
+    _hierarchy_index = None
+
+
 def copy_object(
     arg: ObjectArg,
     name: Optional[str] = None,
     collection: Optional[CollectionArg] = None,
     scale: Optional[ScaleArg] = None,
+    linked: bool = False,
 ) -> Object:
     """
     Copies an object from a template object.
@@ -90,33 +219,127 @@ def copy_object(
     - `collection`: What collection to place the object in, defaults to the first collection of the
       object being copied
     - `scale`: Scale for the new object
+    - `linked`: Whether the copy should share its object data (such as its mesh) with the template
+      instead of getting its own copy, defaults to `False`
 
     Returns: The newly copied object
     """
-    # Get object to copy
-    template_obj = resolve_object(arg)
+    names = [name] if name is not None else None
+    return copy_objects(arg, 1, names, collection, scale, linked)[0]
+
+
+def copy_objects(
+    arg: ObjectArg,
+    count: int,
+    names: Optional[Sequence[str]] = None,
+    collection: Optional[CollectionArg] = None,
+    scale: Union[ScaleArg, Sequence[ScaleArg], None] = None,
+    linked: bool = False,
+) -> list[Object]:
+    """
+    Creates many copies of a template object.
+
+    The template's hierarchy and the parent inverse matrices of its children are computed once and
+    reused for every copy.
+
+    Arguments:
+
+    - `arg`: Template object to copy
+    - `count`: Number of copies to create
+
+    Optional arguments:
+
+    - `names`: Name to give to each new object
+    - `collection`: What collection to place the objects in, defaults to the scene collection
+    - `scale`: Scale for every new object, or a list or array with one scale per object
+    - `linked`: Whether the copies should share their object data (such as their mesh) with the
+      template instead of each getting its own copy, defaults to `False`
 
-    # Copy the object and its mesh data
-    obj = template_obj.copy()
-    obj.data = cast(bpy.types.Mesh, template_obj.data).copy()
+    Returns: The newly copied objects
+    """
+    if names is not None and len(names) != count:
+        raise ValueError(f"Expected {count} names, got {len(names)}")
+
+    # Like a `ScaleArg`, a tuple is a single scale. A list or array has one scale per object.
+    scales: Optional[list[ScaleArg]] = None
+    if scale is not None and not isinstance(scale, (tuple, numbers.Real)):
+        scales = [
+            _resolve_copy_scale(value) for value in cast(Sequence[ScaleArg], scale)
+        ]
+        if len(scales) != count:
+            raise ValueError(f"Expected {count} scales, got {len(scales)}")
 
-    # Link the object to the new collection
+    template_obj = resolve_object(arg)
     coll = resolve_collection(collection)
-    coll.objects.link(obj)
+    plan = _plan_copy(template_obj, get_hierarchy_index())
+
+    copies = []
+    for i in range(count):
+        obj = _copy_from_plan(plan, coll, linked)
 
-    # Recursively create copies of all children
-    for template_child in template_obj.children:
-        child = copy_object(template_child, collection=collection)
-        child.parent = obj
-        child.matrix_parent_inverse = obj.matrix_world.inverted()
+        # Possibly give the object a name
+        if names is not None:
+            obj.name = names[i]
+            if not linked and obj.data is not None:
+                obj.data.name = names[i]
 
-    # Possibly give the object a name
-    if name is not None:
-        obj.name = name
-        obj.data.name = name
+        # Possibly set scale
+        if scales is not None:
+            obj.scale = resolve_scale(scales[i])
+        elif scale is not None:
+            obj.scale = resolve_scale(cast(ScaleArg, scale))
 
-    # Possibly set scale
-    if scale is not None:
-        obj.scale = resolve_scale(scale)
+        copies.append(obj)
 
-    return obj
+    invalidate_hierarchy_index()
+    return copies
+
+
+def _resolve_copy_scale(value) -> ScaleArg:
+    """
+    Converts one item of a list or array of scales, such as a NumPy scalar or row, to a scale.
+    """
+    if isinstance(value, numbers.Real):
+        return float(value)
+    x, y, z = (float(component) for component in value)
+    return (x, y, z)
+
+
+# A copy plan lists a template object and its descendants, parents first. Each entry holds the
+# template object, the position of its parent in the plan (or -1 for the root), and the parent
+# inverse matrix to give its copy.
+CopyPlan = list[tuple[Object, int, Optional[mathutils.Matrix]]]
+
+
+def _plan_copy(template_obj: Object, index: HierarchyIndex) -> CopyPlan:
+    """
+    Walks the hierarchy of a template object once, before any copies are created.
+    """
+    plan: CopyPlan = [(template_obj, -1, None)]
+    position = 0
+    while position < len(plan):
+        template = plan[position][0]
+        children = index.children(template)
+        if children:
+            # A copy starts out with the same world matrix as its template
+            inverse = template.matrix_world.inverted()
+            plan.extend((child, position, inverse) for child in children)
+        position += 1
+    return plan
+
+
+def _copy_from_plan(plan: CopyPlan, coll: bpy.types.Collection, linked: bool) -> Object:
+    """
+    Copies every object in a copy plan, and returns the copy of the root object.
+    """
+    copies: list[Object] = []
+    for template, parent, inverse in plan:
+        obj = cast(Object, template.copy())
+        if not linked and template.data is not None:
+            obj.data = template.data.copy()
+        coll.objects.link(obj)
+        if inverse is not None:
+            obj.parent = copies[parent]
+            obj.matrix_parent_inverse = inverse
+        copies.append(obj)
+    return copies[0]
@@ -2,10 +2,14 @@ __all__ = [
     "camera",
     "collection",
     "context",
+    "names",
     "output",
+    "render",
 ]
 
 from .camera import *
 from .collection import *
 from .context import *
+from .names import *
 from .output import *
+from .render import *
@@ -1,8 +1,9 @@
-from typing import Optional
+from typing import cast, Optional
 
 import bpy
 
 from .context import CollectionArg
+from .names import lookup_id
 
 
 def create_collection(name: str, link: bool = True) -> bpy.types.Collection:
@@ -40,4 +41,4 @@ def resolve_collection(arg: Optional[CollectionArg] = None) -> bpy.types.Collect
         return bpy.context.scene.collection
     if isinstance(arg, bpy.types.Collection):
         return arg
-    return bpy.data.collections[arg]
+    return cast(bpy.types.Collection, lookup_id("collections", arg))
@@ -0,0 +1,197 @@
+from typing import cast, Optional
+
+import bpy
+
+
+class NameIndex:
+    """
+    Index from names to IDs in one `bpy.data` collection, such as `bpy.data.objects`.
+
+    Looking up an ID by name in `bpy.data` scans the whole collection, which gets slow in files
+    with tens of thousands of IDs. The index is built with a single pass, then keeps itself up to
+    date: every hit is checked against the ID's current name, so renamed and removed IDs are
+    detected, and misses fall back to `bpy.data`, so new IDs are picked up.
+    """
+
+    def __init__(self, collection_name: str):
+        self.collection_name = collection_name
+        self._ids: Optional[dict[str, bpy.types.ID]] = None
+
+    def lookup(self, name: str) -> bpy.types.ID:
+        """
+        Returns the ID with a name.
+
+        Raises a `KeyError` if there is no ID with that name.
+        """
+        if self._ids is None:
+            self.rebuild()
+        ids = self._ids or {}
+
+        id_data = ids.get(name)
+        if id_data is not None and _has_name(id_data, name):
+            return id_data
+
+        # The ID is new, renamed or removed since the index was built
+        id_data = getattr(bpy.data, self.collection_name)[name]
+        ids[name] = id_data
+        return id_data
+
+    def rebuild(self):
+        """
+        Rebuilds the index with a single pass over the `bpy.data` collection.
+        """
+        collection = getattr(bpy.data, self.collection_name)
+        self._ids = {id_data.name: id_data for id_data in collection}
+
+    def clear(self):
+        """
+        Discards the index. It is rebuilt on the next lookup.
+        """
+        self._ids = None
+
+
+class PropertyIndex:
+    """
+    Index from the value of a string property, such as a hash, to IDs in one `bpy.data`
+    collection.
+
+    The index is built with a single pass over the collection on the first lookup, so IDs created
+    by earlier runs of a script are found. Every hit is checked against the ID's current property
+    value. IDs are all removed at once when the file is reverted or another file is loaded, so the
+    index is rebuilt when it refers to an ID that no longer exists.
+    """
+
+    def __init__(self, collection_name: str, property_name: str):
+        self.collection_name = collection_name
+        self.property_name = property_name
+        self._ids: dict[str, bpy.types.ID] = {}
+        self._indexed = False
+
+    def lookup(self, key: str) -> Optional[bpy.types.ID]:
+        """
+        Returns the ID whose property has a value, or `None` if there is none.
+        """
+        id_data = self._ids.get(key)
+        if id_data is not None and self._has_key(id_data, key):
+            return id_data
+        if not self._indexed or id_data is not None or self._has_dead_reference():
+            self.rebuild()
+            return self._ids.get(key)
+        return None
+
+    def add(self, id_data: bpy.types.ID, key: str):
+        """
+        Sets the property of an ID and adds it to the index, unless another ID has that value.
+        """
+        id_data[self.property_name] = key
+        cached = self._ids.get(key)
+        if cached is None or not self._has_key(cached, key):
+            self._ids[key] = id_data
+
+    def discard(self, id_data: bpy.types.ID):
+        """
+        Removes the property of an ID and removes it from the index.
+        """
+        key = id_data.get(self.property_name)
+        if key is None:
+            return
+        if self._ids.get(cast(str, key)) == id_data:
+            del self._ids[cast(str, key)]
+        del id_data[self.property_name]
+
+    def rebuild(self):
+        """
+        Rebuilds the index with a single pass over the `bpy.data` collection. The first ID with a
+        value is kept.
+        """
+        self._ids.clear()
+        for id_data in getattr(bpy.data, self.collection_name):
+            key = id_data.get(self.property_name)
+            if key is not None:
+                self._ids.setdefault(cast(str, key), id_data)
+        self._indexed = True
+
+    def _has_key(self, id_data: bpy.types.ID, key: str) -> bool:
+        """
+        Returns whether an ID still exists and its property still has a value.
+        """
+        try:
+            return id_data.get(self.property_name) == key
+        except ReferenceError:
+            return False
+
+    def _has_dead_reference(self) -> bool:
+        """
+        Returns whether the index refers to an ID that no longer exists. Checking one ID is
+        enough, since IDs are removed all at once when a file is loaded.
+        """
+        id_data = next(iter(self._ids.values()), None)
+        if id_data is None:
+            return False
+        try:
+            id_data.name
+        except ReferenceError:
+            return True
+        return False
+
+
+_name_index_enabled = False
+_name_indices: dict[str, NameIndex] = {}
+
+
+def use_name_index(enabled: bool = True):
+    """
+    Sets whether Magnolia resolves object, material and collection names through a name index.
+
+    Optional arguments:
+
+    - `enabled`: Whether to use the name index, defaults to `True`
+    """
+    global _name_index_enabled
+    _name_index_enabled = enabled
+    if not enabled:
+        clear_name_index()
+
+
+def name_index_enabled() -> bool:
+    """
+    Returns whether the name index is enabled.
+    """
+    return _name_index_enabled
+
+
+def clear_name_index():
+    """
+    Discards all name indices, such as after loading a different file.
+    """
+    for index in _name_indices.values():
+        index.clear()
+
+
+def lookup_id(collection_name: str, name: str) -> bpy.types.ID:
+    """
+    Returns an ID from a `bpy.data` collection by name, using the name index if it is enabled.
+
+    Arguments:
+
+    - `collection_name`: Name of the `bpy.data` collection, such as `"objects"`
+    - `name`: Name of the ID
+
+    Returns: The ID with the name
+    """
+    if not _name_index_enabled:
+        return getattr(bpy.data, collection_name)[name]
+    index = _name_indices.get(collection_name)
+    if index is None:
+        index = _name_indices[collection_name] = NameIndex(collection_name)
+    return index.lookup(name)
+
+
+def _has_name(id_data: bpy.types.ID, name: str) -> bool:
+    """
+    Returns whether an ID still exists and still has a name.
+    """
+    try:
+        return id_data.name == name
+    except ReferenceError:
+        return False
@@ -1,5 +1,49 @@
+import json
+import os
+import shutil
+
+from typing import cast, Literal, Optional
+
 import bpy
 
+RenderProfile = Literal["draft", "review", "final"]
+
+# Settings of each render profile. Scene settings are given by their path from the scene, and
+# are skipped if this version of Blender doesn't have them. Numeric settings are upper limits,
+# like the limits below, while other settings are set as given. Limits cap the render levels of
+# subdivision modifiers, the segments of bevel modifiers and the render resolution of curves and
+# text, without raising values that are already lower.
+RENDER_PROFILES: dict[str, dict[str, dict]] = {
+    "draft": {
+        "settings": {
+            "render.resolution_percentage": 50,
+            "render.use_motion_blur": False,
+            "eevee.taa_render_samples": 1,
+            "eevee.use_shadows": False,
+            "eevee.use_soft_shadows": False,
+            "eevee.use_gtao": False,
+            "eevee.use_bloom": False,
+            "eevee.use_ssr": False,
+            "eevee.use_motion_blur": False,
+            "cycles.samples": 16,
+            "cycles.use_denoising": False,
+        },
+        "limits": {"SUBSURF": 0, "BEVEL": 1, "CURVE": 2},
+    },
+    "review": {
+        "settings": {
+            "render.resolution_percentage": 100,
+            "eevee.taa_render_samples": 16,
+            "eevee.use_soft_shadows": False,
+            "eevee.use_ssr": False,
+            "cycles.samples": 128,
+        },
+        "limits": {"SUBSURF": 1, "BEVEL": 2, "CURVE": 6},
+    },
+    # The final profile is the scene as it was set up, before any other profile was applied
+    "final": {"settings": {}, "limits": {}},
+}
+
 
 def set_framerate(rate: int = 30):
     """
@@ -11,3 +55,274 @@ def set_framerate(rate: int = 30):
     """
     bpy.context.scene.render.fps = rate
     bpy.context.scene.render.fps_base = 1
+
+
+class RenderCache:
+    """
+    Content-addressed cache of rendered frames on disk.
+
+    Each image is stored under a key that describes everything that affects the frame, so an
+    image can be reused whenever the same state is rendered again, even in a later run. The
+    cache is bounded in size, and the least recently used images are evicted first.
+    """
+
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, extension: str) -> str:
+        """
+        Returns the path of the cached image for a key.
+        """
+        return os.path.join(self.directory, key + extension)
+
+    def restore(self, key: str, extension: str, destination: str) -> bool:
+        """
+        Copies the cached image for a key to a destination, if there is one.
+
+        Returns: Whether the image was in the cache
+        """
+        path = self.path(key, extension)
+        if not os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        shutil.copyfile(path, destination)
+        os.utime(path)
+        return True
+
+    def store(self, key: str, extension: str, source: str):
+        """
+        Adds a rendered image to the cache.
+        """
+        if os.path.exists(source):
+            shutil.copyfile(source, self.path(key, extension))
+
+    def evict(self):
+        """
+        Removes the least recently used images until the cache fits in its maximum size.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
+
+
+def set_render_cache(
+    directory: Optional[str],
+    max_size: int = 10 * 1024**3,
+    scene: Optional[bpy.types.Scene] = None,
+):
+    """
+    Sets the directory of the render cache, which keeps rendered frames so that frames whose
+    state hasn't changed are not rendered again. The setting is stored in the scene.
+
+    Arguments:
+
+    - `directory`: Directory of the cache, or `None` to stop using the cache
+
+    Optional arguments:
+
+    - `max_size`: Maximum size of the cache in bytes, kept in whole megabytes; defaults to 10 GB
+    - `scene`: The scene to configure, defaults to the current scene
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if directory is None:
+        for key in ("mg_render_cache", "mg_render_cache_size"):
+            if key in scene:
+                del scene[key]
+        return
+    scene["mg_render_cache"] = directory
+    # Integer properties are 32-bit, too small for sizes in bytes, so the size is in megabytes
+    scene["mg_render_cache_size"] = max(max_size // 1024**2, 1)
+
+
+def get_render_cache(scene: Optional[bpy.types.Scene] = None) -> Optional[RenderCache]:
+    """
+    Returns the render cache of a scene, or `None` if it has none. See `set_render_cache`.
+
+    Optional arguments:
+
+    - `scene`: The scene, defaults to the current scene
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    directory = scene.get("mg_render_cache")
+    if directory is None:
+        return None
+    size = cast(int, scene.get("mg_render_cache_size", 0))
+    return RenderCache(bpy.path.abspath(cast(str, directory)), size * 1024**2)
+
+
+def apply_render_profile(
+    profile: RenderProfile, scene: Optional[bpy.types.Scene] = None
+):
+    """
+    Switches a scene to a render profile, such as "draft" for quick renders of emission-only
+    slides, with lower resolution and samples, no shadows, ambient occlusion or bloom, and fewer
+    subdivision levels, bevel segments and curve subdivisions.
+
+    The settings a profile changes are stored in the scene first, and are restored before another
+    profile is applied, so profiles never build on each other. Applying "final" restores the
+    scene as it was before any profile was applied, see `restore_render_profile`. Until then,
+    Magnolia's render functions refuse to render, see `check_render_profile`.
+
+    Arguments:
+
+    - `profile`: "draft", "review" or "final", see `RENDER_PROFILES`
+
+    Optional arguments:
+
+    - `scene`: The scene to change, defaults to the current scene
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    restore_render_profile(scene)
+    if profile == "final":
+        return
+
+    settings = RENDER_PROFILES[profile]
+    # Each saved value is (collection, ID name, path from the ID, property, original value,
+    # value set by the profile)
+    saved: list[tuple[str, str, str, str, object, object]] = []
+
+    def change(
+        id_data: bpy.types.ID, collection: str, path: str, attribute: str, value
+    ):
+        owner = id_data.path_resolve(path) if path else id_data
+        original = getattr(owner, attribute)
+        if original == value:
+            return
+        saved.append((collection, id_data.name, path, attribute, original, value))
+        setattr(owner, attribute, value)
+
+    for setting, value in settings["settings"].items():
+        path, _, attribute = setting.rpartition(".")
+        owner = getattr(scene, path, None)
+        # Settings differ between Blender versions and render engines
+        if owner is None or not hasattr(owner, attribute):
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = min(value, getattr(owner, attribute))
+        change(scene, "scenes", path, attribute, value)
+
+    limits = settings["limits"]
+    curves: set[str] = set()
+    for obj in scene.objects:
+        for modifier in obj.modifiers:
+            path = f"modifiers[{json.dumps(modifier.name)}]"
+            if isinstance(modifier, bpy.types.SubsurfModifier):
+                if modifier.render_levels > limits.get(
+                    "SUBSURF", modifier.render_levels
+                ):
+                    change(obj, "objects", path, "render_levels", limits["SUBSURF"])
+            elif isinstance(modifier, bpy.types.BevelModifier):
+                if modifier.segments > limits.get("BEVEL", modifier.segments):
+                    change(obj, "objects", path, "segments", limits["BEVEL"])
+        if isinstance(obj.data, bpy.types.Curve) and obj.data.name not in curves:
+            curves.add(obj.data.name)
+            _limit_curve_resolution(obj.data, limits.get("CURVE"), change)
+
+    scene["mg_render_profile"] = profile
+    scene["mg_render_profile_saved"] = json.dumps(saved)
+
+
+def restore_render_profile(
+    scene: Optional[bpy.types.Scene] = None, report: bool = False
+) -> list[str]:
+    """
+    Restores the settings changed by `apply_render_profile`, as if "final" were applied.
+
+    Settings that were changed by hand while the profile was applied keep their new value, and
+    settings of objects or modifiers that were removed or renamed are skipped.
+
+    Optional arguments:
+
+    - `scene`: The scene to restore, defaults to the current scene
+    - `report`: Whether to print the settings that weren't restored, defaults to `False`
+
+    Returns: Descriptions of the settings that weren't restored
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    saved = json.loads(cast(str, scene.get("mg_render_profile_saved", "[]")))
+    skipped: list[str] = []
+    for collection, name, path, attribute, original, value in reversed(saved):
+        setting = (
+            f"{collection}[{json.dumps(name)}]{'.' + path if path else ''}.{attribute}"
+        )
+        id_data = getattr(bpy.data, collection).get(name)
+        try:
+            if id_data is None:
+                raise ValueError
+            owner = id_data.path_resolve(path) if path else id_data
+            current = getattr(owner, attribute)
+        except (AttributeError, ValueError):
+            skipped.append(f"{setting}: no longer exists")
+            continue
+        if current != value:
+            skipped.append(
+                f"{setting}: kept {current!r}, changed after the profile was applied"
+            )
+            continue
+        setattr(owner, attribute, original)
+
+    for key in ("mg_render_profile", "mg_render_profile_saved"):
+        if key in scene:
+            del scene[key]
+    if report:
+        for line in skipped:
+            print(f"Not restored: {line}")
+    return skipped
+
+
+def get_render_profile(scene: Optional[bpy.types.Scene] = None) -> RenderProfile:
+    """
+    Returns the render profile applied to a scene with `apply_render_profile`.
+
+    Optional arguments:
+
+    - `scene`: The scene, defaults to the current scene
+
+    Returns: "draft", "review" or "final"
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    return cast(RenderProfile, scene.get("mg_render_profile", "final"))
+
+
+def check_render_profile(
+    scene: Optional[bpy.types.Scene] = None, allow_draft: bool = False
+):
+    """
+    Makes sure a scene is about to be rendered with its final settings.
+
+    Raises an `Exception` if a render profile other than "final" is applied, unless
+    `allow_draft` is set.
+
+    Optional arguments:
+
+    - `scene`: The scene to check, defaults to the current scene
+    - `allow_draft`: Whether rendering with another profile is intended, defaults to `False`
+    """
+    profile = get_render_profile(scene)
+    if profile != "final" and not allow_draft:
+        raise Exception(
+            f'The "{profile}" render profile is applied. Apply the "final" profile, or pass '
+            "allow_draft=True to render with it."
+        )
+
+
+def _limit_curve_resolution(curve: bpy.types.Curve, limit: Optional[int], change):
+    """
+    Lowers the render resolution of a curve or text to a limit, if it is higher.
+    """
+    if limit is None:
+        return
+    # A render resolution of 0 means the viewport resolution is used
+    resolution = curve.render_resolution_u or curve.resolution_u
+    if resolution > limit:
+        change(curve, "curves", "", "render_resolution_u", limit)
@@ -0,0 +1,850 @@
+import hashlib
+import os
+import math
+import shutil
+import subprocess
+import tempfile
+import time
+
+from typing import cast, Iterator, Literal, Optional
+
+import bpy
+import numpy as np
+
+from bpy.types import Object
+
+from .output import check_render_profile, get_render_cache
+
+# Object types that can be drawn with materials
+RENDERABLE_TYPES = {"MESH", "CURVE", "SURFACE", "META", "FONT", "CURVES", "POINTCLOUD"}
+
+# Collections of `bpy.data` whose animation can change what is rendered
+ANIMATED_DATA = (
+    "objects",
+    "meshes",
+    "curves",
+    "materials",
+    "node_groups",
+    "cameras",
+    "lights",
+    "worlds",
+    "scenes",
+    "shape_keys",
+)
+
+# File formats that are written as one movie file, rather than one image per frame
+MOVIE_FORMATS = {"FFMPEG", "AVI_JPEG", "AVI_RAW"}
+
+# Render threads per worker process when the number of workers isn't given
+WORKER_THREADS = 4
+
+# Chunks of frames per worker process, so that workers that finish early can take more work
+CHUNKS_PER_WORKER = 4
+
+# Seconds between checks of worker processes
+POLL_INTERVAL = 0.5
+
+# Properties computed from other properties, which follow the current frame when those are
+# animated. The transforms they are computed from are hashed instead.
+DERIVED_PROPERTIES = {"matrix_world", "matrix_basis", "matrix_local"}
+
+# Attribute data types and the property and width of their values
+ATTRIBUTE_VALUES = {
+    "FLOAT": ("value", 1),
+    "INT": ("value", 1),
+    "FLOAT_VECTOR": ("vector", 3),
+    "FLOAT2": ("vector", 2),
+    "FLOAT_COLOR": ("color", 4),
+    "BYTE_COLOR": ("color", 4),
+}
+
+
+def warmup_materials(
+    scene: Optional[bpy.types.Scene] = None, report: bool = False
+) -> dict[str, float]:
+    """
+    Compiles the shaders of every material used by renderable objects, so that rendering does not
+    stall on shader compilation partway through an animation.
+
+    Each material is rendered once on a small quad in a temporary scene with the same render
+    engine. The time of each render, minus the time of rendering the quad without a material,
+    is the compile time of the material.
+
+    Optional arguments:
+
+    - `scene`: The scene whose materials to compile, defaults to the current scene
+    - `report`: Whether to print compile times, slowest first; defaults to `False`
+
+    Returns: Compile time in seconds of each material, by material name
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    materials = get_render_materials(scene)
+    if not materials:
+        return {}
+
+    # Temporary scene with a camera looking at a quad
+    warmup = bpy.data.scenes.new("MgWarmup")
+    warmup.render.engine = scene.render.engine
+    warmup.render.resolution_x = 16
+    warmup.render.resolution_y = 16
+    warmup.render.film_transparent = scene.render.film_transparent
+    _copy_settings(scene.eevee, warmup.eevee)  # pyright: ignore
+    mesh = bpy.data.meshes.new("MgWarmup")
+    mesh.from_pydata(
+        [(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)], [], [(0, 1, 2, 3)]
+    )
+    quad = bpy.data.objects.new("MgWarmup", mesh)
+    quad["mg_opacity"] = 1.0
+    quad["mg_color"] = (1.0, 1.0, 1.0, 1.0)
+    camera_data = bpy.data.cameras.new("MgWarmup")
+    camera_data.type = "ORTHO"
+    camera = bpy.data.objects.new("MgWarmup", camera_data)
+    camera.location = (0, 0, 10)
+    warmup.collection.objects.link(quad)
+    warmup.collection.objects.link(camera)
+    warmup.camera = camera
+
+    timings: dict[str, float] = {}
+    try:
+        baseline = _time_render(warmup)
+        mesh.materials.append(None)
+        for material in materials:
+            mesh.materials[0] = material
+            timings[material.name] = max(_time_render(warmup) - baseline, 0.0)
+    finally:
+        bpy.data.objects.remove(quad)
+        bpy.data.objects.remove(camera)
+        bpy.data.meshes.remove(mesh)
+        bpy.data.cameras.remove(camera_data)
+        bpy.data.scenes.remove(warmup)
+
+    if report:
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            print(f"{seconds * 1000:8.1f} ms  {name}")
+        print(f"{sum(timings.values()):8.2f} s   total, {len(timings)} materials")
+    return timings
+
+
+def get_render_materials(
+    scene: Optional[bpy.types.Scene] = None,
+) -> list[bpy.types.Material]:
+    """
+    Returns every material used by objects that are rendered at some frame of a scene.
+
+    This includes materials in material slots and materials given to Geometry Nodes modifiers,
+    such as the material of a border.
+
+    Optional arguments:
+
+    - `scene`: The scene to search, defaults to the current scene
+
+    Returns: List of materials, each listed once
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    materials: dict[str, bpy.types.Material] = {}
+    for obj in scene.objects:
+        if obj.type not in RENDERABLE_TYPES or not _is_ever_rendered(obj):
+            continue
+        for slot in obj.material_slots:
+            if slot.material is not None:
+                materials.setdefault(slot.material.name, slot.material)
+        for modifier in obj.modifiers:
+            if isinstance(modifier, bpy.types.NodesModifier):
+                for key in modifier.keys():
+                    value = modifier[key]
+                    if isinstance(value, bpy.types.Material):
+                        materials.setdefault(value.name, value)
+    return list(materials.values())
+
+
+def _is_ever_rendered(obj: Object) -> bool:
+    """
+    Returns whether an object is rendered at some frame, based on its `hide_render` keyframes.
+    """
+    # Imported here, since the animation package depends on the scene package
+    from ..animation.keyframes import find_fcurve, read_keyframes
+
+    fcurve = find_fcurve(obj, "hide_render")
+    if fcurve is not None:
+        _, values = read_keyframes(fcurve)
+        return len(values) == 0 or bool((values < 0.5).any())
+    animation_data = obj.animation_data
+    if animation_data is not None and animation_data.drivers.find("hide_render"):
+        return True
+    return not obj.hide_render
+
+
+def _copy_settings(source: bpy.types.bpy_struct, target: bpy.types.bpy_struct):
+    """
+    Copies the writable settings of one struct to another struct of the same type, since
+    material shaders can depend on render settings.
+    """
+    for prop in source.bl_rna.properties:
+        if prop.is_readonly or prop.type in {"POINTER", "COLLECTION"}:
+            continue
+        try:
+            setattr(target, prop.identifier, getattr(source, prop.identifier))
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+
+def _time_render(scene: bpy.types.Scene) -> float:
+    """
+    Renders a scene without saving the result, and returns how long it took in seconds.
+    """
+    start = time.perf_counter()
+    bpy.ops.render.render(scene=scene.name)
+    return time.perf_counter() - start
+
+
+def frame_fingerprints(
+    scene: Optional[bpy.types.Scene] = None, exact: bool = False
+) -> dict[int, str]:
+    """
+    Computes a fingerprint of the state of every frame of a scene, such that frames with the same
+    fingerprint render the same image.
+
+    By default, the fingerprint is computed from F-curves alone: only the F-curves that change
+    between two frames are evaluated, so holds between animations cost almost nothing. This
+    covers transforms, visibility, `mg_opacity` and material inputs, but not changes that aren't
+    keyframed, such as Geometry Nodes that read the scene time. With `exact`, every frame is also
+    evaluated with `frame_set`, and the world matrix and visibility of every object instance are
+    included, which also covers constraints, parenting and drivers.
+
+    Optional arguments:
+
+    - `scene`: The scene to fingerprint, defaults to the current scene
+    - `exact`: Whether to evaluate every frame, defaults to `False`
+
+    Returns: Fingerprint of each frame, by frame number
+    """
+    # Imported here, since the animation package depends on the scene package
+    from ..animation.keyframes import animated_fcurves, changing_spans
+
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    frames = np.arange(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+    previous_frames = frames - scene.frame_step
+
+    # Find which F-curves change since the previous frame, for every frame
+    fcurves: list[bpy.types.FCurve] = []
+    changes: list[np.ndarray] = []
+    frame_dependent = False
+    for _, id_data, _ in _animated_ids():
+        for fcurve in animated_fcurves(id_data):
+            spans = changing_spans(fcurve)
+            if len(spans) == 0:
+                continue
+            fcurves.append(fcurve)
+            changes.append(
+                np.any(
+                    (spans[:, 0, np.newaxis] < frames)
+                    & (spans[:, 1, np.newaxis] > previous_frames),
+                    axis=0,
+                )
+            )
+        frame_dependent = frame_dependent or _has_frame_drivers(id_data)
+
+    values = np.array([fcurve.evaluate(frames[0]) for fcurve in fcurves])
+    changed = np.array(changes).reshape(len(fcurves), len(frames))
+    changed[:, 0] = False
+
+    fingerprints: dict[int, str] = {}
+    current_frame = scene.frame_current
+    try:
+        for i, frame in enumerate(frames.tolist()):
+            for index in np.flatnonzero(changed[:, i]).tolist():
+                values[index] = fcurves[index].evaluate(frame)
+            digest = hashlib.sha1(values.tobytes())
+            if frame_dependent:
+                # Drivers that read the frame may change anything at any frame
+                digest.update(str(frame).encode())
+            if exact:
+                scene.frame_set(frame)
+                digest.update(_evaluated_state())
+            fingerprints[frame] = digest.hexdigest()
+    finally:
+        if exact:
+            scene.frame_set(current_frame)
+    return fingerprints
+
+
+def render_unique_frames(
+    scene: Optional[bpy.types.Scene] = None,
+    exact: bool = False,
+    reuse: Literal["copy", "manifest"] = "copy",
+    workers: int = 1,
+    allow_draft: bool = False,
+) -> dict[int, int]:
+    """
+    Renders the animation of a scene, rendering each distinct frame only once.
+
+    Frames are compared with `frame_fingerprints`. Repeated frames either get a copy of the image
+    of the first frame with the same state, or are left out and described in a manifest for the
+    ffmpeg concat demuxer, `frames.txt` next to the images, which shows every image for as long as
+    its state lasts. The output must be an image format, not a movie.
+
+    If the scene has a render cache (see `set_render_cache`), frames whose state was rendered
+    before are copied from the cache instead of being rendered.
+    With more than one worker, the remaining frames are rendered by `render_parallel`.
+
+    Optional arguments:
+
+    - `scene`: The scene to render, defaults to the current scene
+    - `exact`: Whether to compare frames by evaluating each one, see `frame_fingerprints`
+    - `reuse`: "copy" to copy the image of repeated frames, or "manifest" to write a manifest
+      instead; defaults to "copy"
+    - `workers`: Number of Blender processes rendering at once, defaults to 1
+    - `allow_draft`: Whether to render with a render profile other than "final", see
+      `check_render_profile`; defaults to `False`
+
+    Returns: For each frame, the frame whose image it shows
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if scene.render.image_settings.file_format in MOVIE_FORMATS:
+        raise Exception("Rendering unique frames needs an image output format")
+    check_render_profile(scene, allow_draft)
+
+    fingerprints = frame_fingerprints(scene, exact=exact)
+    first_frames: dict[str, int] = {}
+    sources = {
+        frame: first_frames.setdefault(fingerprint, frame)
+        for frame, fingerprint in fingerprints.items()
+    }
+    frames = sorted(first_frames.values())
+
+    # Frames rendered before with the same state are taken from the render cache
+    cache = get_render_cache(scene)
+    keys: dict[int, str] = {}
+    extension = scene.render.file_extension
+    if cache is not None:
+        state_hash = scene_state_hash(scene)
+        for frame in frames:
+            keys[frame] = hashlib.sha1(
+                (state_hash + fingerprints[frame]).encode()
+            ).hexdigest()
+        frames = [
+            frame
+            for frame in frames
+            if not cache.restore(
+                keys[frame], extension, scene.render.frame_path(frame=frame)
+            )
+        ]
+
+    if workers > 1:
+        render_parallel(scene, frames, workers=workers, allow_draft=allow_draft)
+    else:
+        render_frames(scene, frames, allow_draft=allow_draft)
+    if cache is not None:
+        for frame in frames:
+            cache.store(keys[frame], extension, scene.render.frame_path(frame=frame))
+        cache.evict()
+
+    if reuse == "copy":
+        for frame, source in sources.items():
+            if frame != source:
+                shutil.copyfile(
+                    scene.render.frame_path(frame=source),
+                    scene.render.frame_path(frame=frame),
+                )
+    else:
+        _write_frame_manifest(scene, sources)
+    return sources
+
+
+def scene_state_hash(scene: Optional[bpy.types.Scene] = None) -> str:
+    """
+    Returns a hash of everything that affects the rendered images of a scene, apart from the
+    values of animated properties, which are covered by `frame_fingerprints`.
+
+    This covers render settings, objects and their transforms, custom properties and modifiers,
+    mesh geometry and attributes, materials, node groups, which properties are animated, and the
+    expressions of drivers.
+
+    Optional arguments:
+
+    - `scene`: The scene to hash, defaults to the current scene
+
+    Returns: The hash, as a hex string
+    """
+    # Imported here, since the animation package depends on the scene package
+    from ..animation.keyframes import animated_fcurves, changing_spans
+
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    digest = hashlib.sha1()
+
+    # Animated channels, in the order used by `frame_fingerprints`, and the values of channels
+    # that never change
+    animated: dict[int, set[str]] = {}
+    for owner, id_data, prefix in _animated_ids():
+        for fcurve in animated_fcurves(id_data):
+            path = prefix + fcurve.data_path
+            animated.setdefault(owner.session_uid, set()).add(path)
+            digest.update(f"{owner.name}|{path}|{fcurve.array_index}".encode())
+            if len(changing_spans(fcurve)) == 0:
+                digest.update(repr(fcurve.evaluate(scene.frame_start)).encode())
+
+        # Driven properties hold whatever value the driver gave them at the current frame, so
+        # their driver is hashed instead of their value
+        animation_data = getattr(id_data, "animation_data", None)
+        for fcurve in animation_data.drivers if animation_data is not None else []:
+            path = prefix + fcurve.data_path
+            animated.setdefault(owner.session_uid, set()).add(path)
+            expression = fcurve.driver.expression if fcurve.driver is not None else None
+            digest.update(
+                f"{owner.name}|driver|{path}|{fcurve.array_index}|{expression}".encode()
+            )
+
+    for settings in (
+        scene.render,
+        scene.render.image_settings,
+        scene.view_settings,
+        scene.eevee,
+        getattr(scene, "cycles", None),
+    ):
+        if settings is not None:
+            _hash_rna(digest, settings, set())
+    digest.update(f"camera={scene.camera.name if scene.camera else None}".encode())
+
+    # Data shared between objects is hashed once
+    data: dict[int, bpy.types.ID] = {}
+    for obj in sorted(scene.objects, key=lambda obj: obj.name):
+        paths = animated.get(obj.session_uid, set())
+        digest.update(f"object={obj.name}|{obj.type}".encode())
+        digest.update(f"parent={obj.parent.name if obj.parent else None}".encode())
+        _hash_rna(digest, obj, paths)
+        _hash_custom_properties(digest, obj, paths)
+        for slot in obj.material_slots:
+            digest.update(f"slot={slot.link}|{_id_name(slot.material)}".encode())
+            if slot.material is not None:
+                data.setdefault(slot.material.session_uid, slot.material)
+        for modifier in obj.modifiers:
+            digest.update(f"modifier={modifier.name}|{modifier.type}".encode())
+            _hash_rna(digest, modifier, paths)
+            _hash_custom_properties(digest, modifier, paths)
+            for value in modifier.values():
+                if isinstance(value, bpy.types.ID):
+                    data.setdefault(value.session_uid, value)
+            group = getattr(modifier, "node_group", None)
+            if group is not None:
+                data.setdefault(group.session_uid, group)
+        if obj.data is not None:
+            digest.update(f"data={obj.data.name}".encode())
+            data.setdefault(obj.data.session_uid, obj.data)
+    if scene.world is not None:
+        data.setdefault(scene.world.session_uid, scene.world)
+
+    for id_data in sorted(data.values(), key=lambda id_data: id_data.name):
+        paths = animated.get(id_data.session_uid, set())
+        digest.update(f"id={id_data.name}".encode())
+        if isinstance(id_data, bpy.types.Mesh):
+            _hash_mesh(digest, id_data, paths)
+        else:
+            _hash_rna(digest, id_data, paths)
+        _hash_custom_properties(digest, id_data, paths)
+        node_tree = getattr(id_data, "node_tree", None) or id_data
+        if isinstance(node_tree, bpy.types.NodeTree):
+            _hash_node_tree(digest, node_tree, paths)
+    return digest.hexdigest()
+
+
+def render_frames(scene: bpy.types.Scene, frames: list[int], allow_draft: bool = False):
+    """
+    Renders single frames of a scene to the paths the animation would render them to.
+
+    Arguments:
+
+    - `scene`: The scene to render
+    - `frames`: Frames to render
+
+    Optional arguments:
+
+    - `allow_draft`: Whether to render with a render profile other than "final", see
+      `check_render_profile`; defaults to `False`
+    """
+    check_render_profile(scene, allow_draft)
+    current_frame = scene.frame_current
+    try:
+        for frame in frames:
+            scene.frame_set(frame)
+            bpy.ops.render.render(write_still=True, scene=scene.name)
+    finally:
+        scene.frame_set(current_frame)
+
+
+def render_parallel(
+    scene: Optional[bpy.types.Scene] = None,
+    frames: Optional[list[int]] = None,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    retries: int = 2,
+    costs: Optional[dict[int, float]] = None,
+    report: bool = False,
+    allow_draft: bool = False,
+):
+    """
+    Renders frames of a scene with several background Blender processes at once, which keeps
+    many CPU cores busy on scenes that a single process renders with little parallelism.
+
+    The current state of the file is saved to a temporary copy that every worker opens. Frames
+    are split into runs of consecutive frames with about the same estimated cost, and idle
+    workers take the next run, so that all workers finish at about the same time. Runs whose
+    worker fails are rendered again. Images are written to the paths the animation would render
+    them to, so they form the same image sequence as rendering the animation.
+
+    Optional arguments:
+
+    - `scene`: The scene to render, defaults to the current scene
+    - `frames`: Frames to render, defaults to every frame of the animation
+    - `workers`: Number of Blender processes, defaults to one for every 4 CPU cores
+    - `threads`: Number of render threads of each process, defaults to sharing the CPU cores
+      between the processes
+    - `retries`: How many times to render the frames of a failed process again, defaults to 2
+    - `costs`: Estimated cost of each frame, defaults to `estimate_frame_costs`
+    - `report`: Whether to print progress, defaults to `False`
+    - `allow_draft`: Whether to render with a render profile other than "final", see
+      `check_render_profile`; defaults to `False`
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if scene.render.image_settings.file_format in MOVIE_FORMATS:
+        raise Exception("Rendering in parallel needs an image output format")
+    check_render_profile(scene, allow_draft)
+    if frames is None:
+        frames = list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+    if len(frames) == 0:
+        return
+
+    cpu_count = os.cpu_count() or 1
+    workers = workers or max(cpu_count // WORKER_THREADS, 1)
+    threads = threads or max(cpu_count // workers, 1)
+    if costs is None:
+        costs = estimate_frame_costs(scene, frames)
+    pending = [
+        (chunk, 0)
+        for chunk in _split_frames(
+            frames,
+            [costs.get(frame, 1.0) for frame in frames],
+            workers * CHUNKS_PER_WORKER,
+        )
+    ]
+
+    # Workers open a copy of the file as it is now, and write to the same absolute paths
+    directory = tempfile.mkdtemp(prefix="magnolia-render-")
+    blend_path = os.path.join(directory, "scene.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True, check_existing=False)
+    setup = (
+        "import bpy; render = bpy.context.scene.render; "
+        f"render.filepath = {bpy.path.abspath(scene.render.filepath)!r}; "
+        "render.use_overwrite = True; render.use_placeholder = False"
+    )
+
+    start = math.floor(time.time())
+    running: list[tuple[subprocess.Popen, list[int], int, str]] = []
+    rendered = 0
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                chunk, attempt = pending.pop(0)
+                log_path = os.path.join(directory, f"frames-{chunk[0]}-{attempt}.log")
+                with open(log_path, "w") as log:
+                    process = subprocess.Popen(
+                        [
+                            bpy.app.binary_path,
+                            "--background",
+                            blend_path,
+                            "--scene",
+                            scene.name,
+                            "--python-expr",
+                            setup,
+                            "--threads",
+                            str(threads),
+                            "--render-frame",
+                            ",".join(str(frame) for frame in chunk),
+                        ],
+                        stdout=log,
+                        stderr=subprocess.STDOUT,
+                    )
+                running.append((process, chunk, attempt, log_path))
+
+            time.sleep(POLL_INTERVAL)
+            for job in list(running):
+                process, chunk, attempt, log_path = job
+                if process.poll() is None:
+                    continue
+                running.remove(job)
+                missing = [
+                    frame for frame in chunk if not _is_rendered(scene, frame, start)
+                ]
+                if len(missing) == 0:
+                    continue
+                if attempt >= retries:
+                    with open(log_path) as log:
+                        output = log.read()[-2000:]
+                    raise Exception(
+                        f"Rendering frames {missing} failed after {attempt + 1} attempts:\n"
+                        f"{output}"
+                    )
+                # Failed frames go first, so they don't hold up the end of the render
+                pending.insert(0, (missing, attempt + 1))
+
+            if report:
+                count = sum(_is_rendered(scene, frame, start) for frame in frames)
+                if count != rendered:
+                    rendered = count
+                    print(f"Rendered {rendered}/{len(frames)} frames", flush=True)
+    finally:
+        for process, *_ in running:
+            process.kill()
+            process.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def estimate_frame_costs(
+    scene: Optional[bpy.types.Scene] = None, frames: Optional[list[int]] = None
+) -> dict[int, float]:
+    """
+    Estimates how long each frame of a scene takes to render, relative to other frames.
+
+    The estimate adds up the objects that are rendered at each frame, based on their
+    `hide_render` keyframes, weighting meshes by their number of faces and objects by their
+    number of modifiers.
+
+    Optional arguments:
+
+    - `scene`: The scene to estimate, defaults to the current scene
+    - `frames`: Frames to estimate, defaults to every frame of the animation
+
+    Returns: The estimated cost of each frame
+    """
+    # Imported here, since the animation package depends on the scene package
+    from ..animation.keyframes import find_fcurve, read_keyframes
+
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if frames is None:
+        frames = list(range(scene.frame_start, scene.frame_end + 1, scene.frame_step))
+    frame_array = np.asarray(frames, dtype=np.float64)
+
+    # Every frame has a fixed cost, such as updating the scene and saving the image
+    costs = np.ones(len(frames))
+    for obj in scene.objects:
+        if obj.type not in RENDERABLE_TYPES:
+            continue
+        cost = 1 + len(obj.modifiers)
+        if obj.type == "MESH":
+            cost += len(cast(bpy.types.Mesh, obj.data).polygons) / 1000
+
+        fcurve = find_fcurve(obj, "hide_render")
+        key_frames, values = (
+            read_keyframes(fcurve) if fcurve is not None else (np.empty(0), np.empty(0))
+        )
+        if len(key_frames) == 0:
+            if not obj.hide_render:
+                costs += cost
+            continue
+        # Visibility holds its value until the next keyframe
+        indices = np.searchsorted(key_frames, frame_array, side="right") - 1
+        costs += cost * (values[np.maximum(indices, 0)] < 0.5)
+    return dict(zip(frames, costs.tolist()))
+
+
+def _split_frames(frames: list[int], costs: list[float], count: int) -> list[list[int]]:
+    """
+    Splits frames into at most `count` runs of consecutive frames with about the same total
+    cost, with the most expensive runs first.
+    """
+    frame_array = np.asarray(frames)
+    cost_array = np.maximum(np.asarray(costs, dtype=np.float64), 1e-9)
+    count = min(count, len(frames))
+
+    # Each frame belongs to the run containing the middle of its share of the total cost
+    middles = np.cumsum(cost_array) - cost_array / 2
+    runs = np.minimum((middles / cost_array.sum() * count).astype(int), count - 1)
+    starts = np.flatnonzero(np.diff(runs)) + 1
+    chunks = np.split(frame_array, starts)
+    chunk_costs = np.add.reduceat(cost_array, np.r_[0, starts])
+    order = np.argsort(-chunk_costs, kind="stable")
+    return [chunks[index].tolist() for index in order]
+
+
+def _is_rendered(scene: bpy.types.Scene, frame: int, since: float) -> bool:
+    """
+    Returns whether the image of a frame was written since a time.
+    """
+    path = scene.render.frame_path(frame=frame)
+    return os.path.exists(path) and os.path.getmtime(path) >= since
+
+
+def _write_frame_manifest(scene: bpy.types.Scene, sources: dict[int, int]) -> str:
+    """
+    Writes an ffmpeg concat manifest that shows the image of each run of repeated frames for the
+    length of the run, and returns its path.
+    """
+    frame_duration = scene.frame_step * scene.render.fps_base / scene.render.fps
+    runs: list[list] = []
+    for frame in sorted(sources):
+        path = scene.render.frame_path(frame=sources[frame])
+        if runs and runs[-1][0] == path:
+            runs[-1][1] += frame_duration
+        else:
+            runs.append([path, frame_duration])
+
+    lines = []
+    for path, duration in runs:
+        lines.append(f"file '{_escape_manifest_path(path)}'")
+        lines.append(f"duration {duration:.6f}")
+    if runs:
+        # The concat demuxer ignores the duration of the last entry unless it is repeated
+        lines.append(f"file '{_escape_manifest_path(runs[-1][0])}'")
+
+    manifest = os.path.join(
+        os.path.dirname(scene.render.frame_path(frame=scene.frame_start)), "frames.txt"
+    )
+    with open(manifest, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return manifest
+
+
+def _escape_manifest_path(path: str) -> str:
+    """
+    Escapes a path for a quoted string in an ffmpeg concat manifest.
+    """
+    return path.replace("'", "'\\''")
+
+
+def _animated_ids() -> Iterator[tuple[bpy.types.ID, bpy.types.ID, str]]:
+    """
+    Yields every ID whose animation can change what is rendered: the IDs of `ANIMATED_DATA`, and
+    the node trees embedded in them, such as those of materials, which have their own animation
+    data. Each ID comes with the ID that owns it and its path in that owner.
+    """
+    for collection_name in ANIMATED_DATA:
+        for id_data in getattr(bpy.data, collection_name):
+            yield id_data, id_data, ""
+            node_tree = getattr(id_data, "node_tree", None)
+            if isinstance(node_tree, bpy.types.NodeTree):
+                yield id_data, node_tree, "node_tree."
+
+
+def _has_frame_drivers(id_data: bpy.types.ID) -> bool:
+    """
+    Returns whether an ID has drivers whose expression reads the current frame.
+    """
+    animation_data = getattr(id_data, "animation_data", None)
+    if animation_data is None:
+        return False
+    return any(
+        "frame" in fcurve.driver.expression
+        for fcurve in animation_data.drivers
+        if fcurve.driver is not None and fcurve.driver.type == "SCRIPTED"
+    )
+
+
+def _evaluated_state() -> bytes:
+    """
+    Returns the world matrix and opacity of every visible object instance in the evaluated scene.
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    state = []
+    for instance in depsgraph.object_instances:
+        obj = cast(Object, instance.object)
+        if obj.type not in RENDERABLE_TYPES:
+            continue
+        state.append(obj.name)
+        state.append(np.array(instance.matrix_world, dtype=np.float32).tobytes().hex())
+        state.append(str(obj.get("mg_opacity")))
+    return "\n".join(state).encode()
+
+
+def _hash_rna(digest, struct: bpy.types.bpy_struct, animated: set[str]):
+    """
+    Adds the writable, non-animated settings of a struct to a hash.
+    """
+    for prop in struct.bl_rna.properties:
+        if prop.is_readonly or prop.type in {"POINTER", "COLLECTION"}:
+            continue
+        if prop.identifier in DERIVED_PROPERTIES:
+            continue
+        try:
+            path = struct.path_from_id(prop.identifier)
+        except ValueError:
+            path = prop.identifier
+        if path in animated:
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if hasattr(value, "__len__") and not isinstance(value, str):
+            value = tuple(value)  # pyright: ignore
+        digest.update(f"{prop.identifier}={value!r};".encode())
+
+
+def _hash_custom_properties(digest, struct: bpy.types.bpy_struct, animated: set[str]):
+    """
+    Adds the non-animated custom properties of a struct to a hash.
+    """
+    for key in sorted(struct.keys()):
+        if f'["{key}"]' in animated:
+            continue
+        value = struct[key]
+        if isinstance(value, bpy.types.ID):
+            value = value.name
+        elif hasattr(value, "to_list"):
+            value = value.to_list()
+        elif hasattr(value, "to_dict"):
+            value = value.to_dict()
+        digest.update(f"[{key}]={value!r};".encode())
+
+
+def _hash_mesh(digest, mesh: bpy.types.Mesh, animated: set[str]):
+    """
+    Adds the geometry and attributes of a mesh to a hash, skipping animated attributes.
+    """
+    for collection, name, width, dtype in (
+        (mesh.loops, "vertex_index", 1, np.int32),
+        (mesh.polygons, "loop_start", 1, np.int32),
+        (mesh.polygons, "material_index", 1, np.int32),
+        (mesh.edges, "vertices", 2, np.int32),
+    ):
+        values = np.empty(len(collection) * width, dtype=dtype)
+        collection.foreach_get(name, values)
+        digest.update(values.tobytes())
+    for attribute in mesh.attributes:
+        value_name, width = ATTRIBUTE_VALUES.get(attribute.data_type, (None, 0))
+        if value_name is None:
+            continue
+        if any(path.startswith(f'attributes["{attribute.name}"]') for path in animated):
+            continue
+        data = attribute.data  # pyright: ignore
+        values = np.empty(len(data) * width, dtype=np.float32)
+        data.foreach_get(value_name, values)  # pyright: ignore
+        digest.update(f"{attribute.name}|{attribute.domain}".encode())
+        digest.update(values.tobytes())
+    for material in mesh.materials:
+        digest.update(f"material={_id_name(material)}".encode())
+
+
+def _hash_node_tree(digest, node_tree: bpy.types.NodeTree, animated: set[str]):
+    """
+    Adds the nodes, links and unconnected input values of a node tree to a hash.
+    """
+    # Paths of animated node inputs start with the path of the node tree in its owner
+    prefix = "node_tree." if node_tree.is_embedded_data else ""
+    tree_paths = {path.removeprefix(prefix) for path in animated}
+    for node in sorted(node_tree.nodes, key=lambda node: node.name):
+        digest.update(f"node={node.name}|{node.bl_idname}".encode())
+        _hash_rna(digest, node, tree_paths)
+        for socket in node.inputs:
+            if not socket.is_linked:
+                _hash_rna(digest, socket, tree_paths)
+    for link in node_tree.links:
+        from_node, to_node = cast(bpy.types.Node, link.from_node), link.to_node
+        from_socket = cast(bpy.types.NodeSocket, link.from_socket)
+        to_socket = cast(bpy.types.NodeSocket, link.to_socket)
+        digest.update(
+            f"link={from_node.name}|{from_socket.identifier}|"
+            f"{cast(bpy.types.Node, to_node).name}|{to_socket.identifier}".encode()
+        )
+
+
+def _id_name(id_data: Optional[bpy.types.ID]) -> Optional[str]:
+    """
+    Returns the name of an ID, or `None`.
+    """
+    return id_data.name if id_data is not None else None
@@ -1,13 +1,17 @@
 __all__ = [
     "colors",
+    "layout",
     "objects",
     "position",
+    "preview",
     "slide",
 ]
 
 from .colors import *
+from .layout import *
 from .objects import *
 from .objects.object import *
 from .objects.rectangle import *
 from .position import *
+from .preview import *
 from .slide import *
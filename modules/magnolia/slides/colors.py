@@ -2,7 +2,12 @@ from typing import cast
 
 import bpy
 
-from ..objects.material import create_emission_material, get_or_create_emission_material
+from ..objects.material import (
+    create_emission_material,
+    get_or_create_attribute_emission_material,
+    get_or_create_emission_material,
+)
+from ..objects.object import ObjectArg, resolve_object
 
 
 Color = tuple[int, int, int]
@@ -18,6 +23,9 @@ def color_material(
     """
     Gets or creates an emission color material.
 
+    Every color gets its own material. For many colors, such as gradients and heatmaps, use
+    `attribute_color_material` with `set_color` instead, which shares a single material.
+
     Optional arguments:
 
     - `name`: The name of the material.
@@ -34,3 +42,50 @@ def color_material(
         shadow="NONE",
         opacity_control=opacity_controls,
     )
+
+
+def attribute_color_material() -> bpy.types.Material:
+    """
+    Gets or creates the emission material whose color is read from the `mg_color` property of
+    each object, and whose opacity is read from the `mg_opacity` property.
+
+    All objects using this material share one shader, however many colors they have. Set the
+    color of an object with `set_color`.
+    """
+    return get_or_create_attribute_emission_material("MgAttributeColorMat", "OBJECT")
+
+
+def reads_color_attribute(material: bpy.types.Material) -> bool:
+    """
+    Returns whether a material reads its color from the `mg_color` property of each object, like
+    `attribute_color_material`, so that `set_color` changes its color.
+
+    Arguments:
+
+    - `material`: The material to check
+    """
+    if not material.use_nodes or material.node_tree is None:
+        return False
+    return any(
+        isinstance(node, bpy.types.ShaderNodeAttribute)
+        and node.attribute_type == "OBJECT"
+        and node.attribute_name == "mg_color"
+        for node in material.node_tree.nodes
+    )
+
+
+def set_color(obj: ObjectArg, color: Color):
+    """
+    Sets the color of an object that uses `attribute_color_material`.
+
+    The color is stored in the `mg_color` property, and can be animated by keyframing
+    `'["mg_color"]'`.
+
+    Arguments:
+
+    - `obj`: The object to color
+    - `color`: The color, with each value in the range [0, 255]
+    """
+    obj = resolve_object(obj)
+    red, green, blue = color
+    obj["mg_color"] = (red / 255, green / 255, blue / 255, 1.0)
@@ -0,0 +1,210 @@
+import math
+
+from typing import cast, Literal, Optional, Union
+
+import bpy
+import mathutils
+import numpy as np
+
+from bpy.types import Object
+
+from ..objects.object import ObjectArg, ObjectsArg, resolve_objects
+from .position import (
+    Anchor,
+    BoundingBox,
+    get_bounding_boxes,
+    Position,
+    resolve_position,
+)
+
+LayoutDirection = Literal["row", "column", "grid"]
+
+# Spacing in pixels, either the same for both axes or (horizontal, vertical)
+Spacing = Union[float, tuple[float, float]]
+
+# Position of each anchor within a box, as a fraction of its width and height
+ANCHOR_FACTORS: dict[Anchor, tuple[float, float]] = {
+    "topleft": (0, 1),
+    "top": (0.5, 1),
+    "topright": (1, 1),
+    "left": (0, 0.5),
+    "center": (0.5, 0.5),
+    "right": (1, 0.5),
+    "bottomleft": (0, 0),
+    "bottom": (0.5, 0),
+    "bottomright": (1, 0),
+}
+
+
+def layout(
+    objects: ObjectsArg,
+    direction: LayoutDirection = "row",
+    position: Position = (0.5, 0.5),
+    anchor: Anchor = "center",
+    columns: Optional[int] = None,
+    gap: Spacing = 0,
+    padding: Spacing = 0,
+    align: Anchor = "center",
+    uniform: bool = False,
+) -> BoundingBox:
+    """
+    Arranges objects in a row, a column or a grid, based on their bounding boxes.
+
+    The layout is a box containing one cell per object. Cells are sized to fit the largest object
+    in their column and row, and each object is placed within its cell according to `align`.
+    Objects are moved by changing their location, so their meshes are left unchanged.
+
+    Arguments:
+
+    - `objects`: Objects to arrange, in order from left to right, then top to bottom
+
+    Optional arguments:
+
+    - `direction`: "row", "column" or "grid", defaults to "row"
+    - `position`: Position of the layout on the slide, defaults to the center of the slide
+    - `anchor`: Point of the layout placed at `position`, as in `set_anchor`; defaults to "center"
+    - `columns`: Number of columns of a grid, defaults to a roughly square grid
+    - `gap`: Space between cells in pixels, either one value or (horizontal, vertical)
+    - `padding`: Space around the cells in pixels, either one value or (horizontal, vertical)
+    - `align`: Point of each object placed at the same point of its cell, defaults to "center"
+    - `uniform`: Whether all cells have the size of the largest object, defaults to `False`
+
+    Returns: Bounding box of the whole layout, of the form ((min_x, min_y), (max_x, max_y))
+    """
+    objs = resolve_objects(objects)
+    if len(objs) == 0:
+        x, y, _ = resolve_position(position)
+        return ((x, y), (x, y))
+
+    bounding_boxes = get_bounding_boxes(cast(list[ObjectArg], objs))
+    sizes = bounding_boxes[:, 1] - bounding_boxes[:, 0]
+    cells, container = compute_layout(
+        sizes,
+        direction=direction,
+        columns=columns,
+        gap=_scale_spacing(gap),
+        padding=_scale_spacing(padding),
+        uniform=uniform,
+    )
+
+    # Move the layout so its anchor is at the requested position
+    x, y, _ = resolve_position(position)
+    shift = np.array([x, y]) - _anchor_points(container[np.newaxis], anchor)[0]
+    cells += shift
+    container += shift
+
+    # Offset of each object from where it is to where it belongs in its cell
+    offsets = _anchor_points(cells, align) - _anchor_points(bounding_boxes, align)
+    _translate_objects(objs, offsets)
+
+    # Update world matrices, so that bounding boxes read right after the layout are current
+    bpy.context.view_layer.update()
+
+    (min_x, min_y), (max_x, max_y) = container.tolist()
+    return ((min_x, min_y), (max_x, max_y))
+
+
+def compute_layout(
+    sizes: np.ndarray,
+    direction: LayoutDirection = "row",
+    columns: Optional[int] = None,
+    gap: tuple[float, float] = (0, 0),
+    padding: tuple[float, float] = (0, 0),
+    uniform: bool = False,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the cells of a layout for items of the given sizes, with the bottom left corner of
+    the layout at the origin. All values are in world units.
+
+    Arguments:
+
+    - `sizes`: Array of shape (N, 2) with the width and height of each item
+
+    Optional arguments:
+
+    - `direction`: "row", "column" or "grid", defaults to "row"
+    - `columns`: Number of columns of a grid, defaults to a roughly square grid
+    - `gap`: Space between cells as (horizontal, vertical)
+    - `padding`: Space around the cells as (horizontal, vertical)
+    - `uniform`: Whether all cells have the size of the largest item, defaults to `False`
+
+    Returns: Cell boxes as an array of shape (N, 2, 2), and the box of the whole layout as an
+    array of shape (2, 2). Boxes are of the form ((min_x, min_y), (max_x, max_y)).
+    """
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    count = len(sizes)
+    match direction:
+        case "row":
+            column_count = max(count, 1)
+        case "column":
+            column_count = 1
+        case "grid":
+            column_count = columns or max(math.ceil(math.sqrt(count)), 1)
+    row_count = max(math.ceil(count / column_count), 1)
+
+    indices = np.arange(count)
+    column_index = indices % column_count
+    row_index = indices // column_count
+
+    # Each column is as wide as its widest item, and each row as tall as its tallest item
+    if uniform:
+        largest = sizes.max(axis=0) if count > 0 else np.zeros(2)
+        column_widths = np.full(column_count, largest[0])
+        row_heights = np.full(row_count, largest[1])
+    else:
+        column_widths = np.zeros(column_count)
+        row_heights = np.zeros(row_count)
+        np.maximum.at(column_widths, column_index, sizes[:, 0])
+        np.maximum.at(row_heights, row_index, sizes[:, 1])
+
+    gap_x, gap_y = gap
+    padding_x, padding_y = padding
+    width = column_widths.sum() + gap_x * (column_count - 1) + 2 * padding_x
+    height = row_heights.sum() + gap_y * (row_count - 1) + 2 * padding_y
+
+    # Columns run from left to right, and rows from top to bottom
+    lefts = padding_x + np.concatenate(([0], np.cumsum(column_widths + gap_x)[:-1]))
+    tops = (
+        height - padding_y - np.concatenate(([0], np.cumsum(row_heights + gap_y)[:-1]))
+    )
+
+    cells = np.empty((count, 2, 2))
+    cells[:, 0, 0] = lefts[column_index]
+    cells[:, 1, 0] = lefts[column_index] + column_widths[column_index]
+    cells[:, 1, 1] = tops[row_index]
+    cells[:, 0, 1] = tops[row_index] - row_heights[row_index]
+    container = np.array([[0, 0], [width, height]], dtype=np.float64)
+    return cells, container
+
+
+def _anchor_points(boxes: np.ndarray, anchor: Anchor) -> np.ndarray:
+    """
+    Returns the anchor point of each box in an array of shape (N, 2, 2), like
+    `get_anchor_point` does for a single box.
+    """
+    factors = np.array(ANCHOR_FACTORS[anchor])
+    return boxes[:, 0] + (boxes[:, 1] - boxes[:, 0]) * factors
+
+
+def _scale_spacing(spacing: Spacing) -> tuple[float, float]:
+    """
+    Converts spacing in pixels to world units.
+    """
+    if isinstance(spacing, tuple):
+        return (spacing[0] / 100, spacing[1] / 100)
+    return (spacing / 100, spacing / 100)
+
+
+def _translate_objects(objs: list[Object], offsets: np.ndarray):
+    """
+    Moves each object by a world-space offset in x and y.
+    """
+    for obj, (dx, dy) in zip(objs, offsets.tolist()):
+        if dx == 0 and dy == 0:
+            continue
+        offset = mathutils.Vector((dx, dy, 0))
+        if obj.parent is not None:
+            # Locations of children are relative to their parent
+            parent_matrix = obj.parent.matrix_world @ obj.matrix_parent_inverse
+            offset = parent_matrix.inverted().to_3x3() @ offset
+        obj.location += offset
@@ -24,6 +24,9 @@ def set_object_default_properties(obj: ObjectArg):
 
 
 def set_opacity(obj: ObjectArg, opacity: float):
+    """
+    Sets the opacity of an object. To animate opacity, use `fade_in`, `fade_out` or `fade_to`.
+    """
     obj = resolve_object(obj)
     obj["mg_opacity"] = opacity
 
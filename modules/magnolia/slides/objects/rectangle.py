@@ -1,13 +1,52 @@
-from typing import Optional
+from typing import cast, Optional, Sequence, Union
+
+from bpy.types import Object
+
+import bpy
+import numpy as np
+
+from numpy.typing import ArrayLike
 
 from magnolia.slides.objects.object import set_object_default_properties
 
-from ...objects.material import MaterialArg, assign_material, resolve_material
-from ...objects.mesh import create_object_from_mesh_data
+from ...animation.keyframes import batch, EASING_PRESETS, EasingPreset, insert_keyframes
+from ...objects.geonodes import apply_geonodes, get_geonodes_group
+from ...objects.material import (
+    assign_material,
+    get_or_create_attribute_emission_material,
+    MaterialArg,
+    resolve_material,
+)
+from ...objects.mesh import create_object_from_mesh_data, MeshData
+from ...objects.object import ObjectArg, resolve_object
 from ...scene.collection import resolve_collection
 from ...scene.context import CollectionArg
-from ..colors import Color, color_material
-from ..position import Anchor, Position, resolve_position, set_anchor, scale_size
+from ..colors import (
+    attribute_color_material,
+    Color,
+    color_material,
+    reads_color_attribute,
+    set_color,
+)
+from ..position import (
+    Anchor,
+    get_anchor_point,
+    Position,
+    resolve_position,
+    resolve_positions,
+    scale_size,
+)
+
+# Data type and value property of each rectangle attribute
+RECTANGLE_ATTRIBUTES: dict[str, tuple[str, str]] = {
+    "position": ("FLOAT_VECTOR", "vector"),
+    "mg_size": ("FLOAT_VECTOR", "vector"),
+    "mg_color": ("FLOAT_COLOR", "color"),
+    "mg_opacity": ("FLOAT", "value"),
+}
+
+# Name of the Geometry Nodes group that draws the rectangles of `create_rectangles`
+RECTANGLES_GROUP_NAME = "Magnolia_Rectangles_NodeGroup"
 
 
 def create_rectangle(
@@ -18,28 +57,348 @@ def create_rectangle(
     height: float = 100,
     anchor: Anchor = "center",
     collection: Optional[CollectionArg] = None,
+    color: Optional[Color] = None,
 ):
-    # Get rectangle material
+    """
+    Creates a rectangle.
+
+    Optional arguments:
+
+    - `name`: Name of the object, defaults to "Rectangle"
+    - `material`: Material of the rectangle, defaults to a black color material, or to
+      `attribute_color_material` if `color` is given
+    - `position`: Position of the rectangle, defaults to the center of the slide
+    - `width`: Width in pixels, defaults to 100
+    - `height`: Height in pixels, defaults to 100
+    - `anchor`: Point of the rectangle placed at `position`, defaults to "center"
+    - `collection`: The collection to link the new object to
+    - `color`: Color stored in the `mg_color` property with `set_color`. The material must read
+      that property, like `attribute_color_material` does.
+
+    Returns: The new rectangle
+    """
     if material is None:
-        material = color_material(color=(0, 0, 0))
+        material = (
+            attribute_color_material()
+            if color is not None
+            else color_material(color=(0, 0, 0))
+        )
     material = resolve_material(material)
+    if color is not None and not reads_color_attribute(material):
+        raise Exception(
+            f"Material {material.name} does not read the mg_color property, so it can't be "
+            "given a color"
+        )
     coll = resolve_collection(collection)
 
-    # Create rectangle
+    # Create rectangle, with its origin at the anchor point. Rectangles of the same size and
+    # anchor have identical geometry, so they can share a mesh when the mesh cache is enabled.
     width, height = scale_size(width, height)
-    rectangle_data = (
+    x, y = get_anchor_point(((0, 0), (width, height)), anchor)
+    rectangle_data: MeshData = (
         [
-            (0, 0, 0),
-            (0, height, 0),
-            (width, height, 0),
-            (width, 0, 0),
+            (-x, -y, 0),
+            (-x, height - y, 0),
+            (width - x, height - y, 0),
+            (width - x, -y, 0),
         ],
         [(0, 1), (1, 2), (2, 3), (3, 0)],
         [(0, 1, 2, 3)],
     )
     obj = create_object_from_mesh_data(rectangle_data, name=name, collection=collection)
-    set_anchor(obj, anchor)
     assign_material(obj, material)
     obj.location = resolve_position(position)
+    set_object_default_properties(obj)
+    if color is not None:
+        set_color(obj, color)
+    return obj
+
+
+def create_rectangles(
+    positions: Union[Sequence[Position], np.ndarray],
+    sizes: Union[tuple[float, float], Sequence[tuple[float, float]], np.ndarray] = (
+        100,
+        100,
+    ),
+    colors: Union[Color, Sequence[Color], np.ndarray] = (0, 0, 0),
+    opacities: Union[float, Sequence[float], np.ndarray] = 1.0,
+    anchor: Anchor = "center",
+    name: str = "Rectangles",
+    collection: Optional[CollectionArg] = None,
+) -> Object:
+    """
+    Creates many rectangles as a single object.
+
+    Each rectangle is a point of the object's mesh, and a Geometry Nodes modifier places one
+    shared quad on every point. The size, color and opacity of each rectangle are stored as
+    point attributes, so thousands of rectangles cost one object, one mesh and one material.
+    Use `animate_rectangles` to animate them.
+
+    Arguments:
+
+    - `positions`: Position of each rectangle, as an (N, 2) or (N, 3) array or a list of positions
+
+    Optional arguments:
+
+    - `sizes`: Size in pixels as (width, height), either one for all rectangles or one each
+    - `colors`: Color of the rectangles, either one for all rectangles or one each
+    - `opacities`: Opacity of the rectangles, either one for all rectangles or one each
+    - `anchor`: Point of each rectangle placed at its position, defaults to "center"
+    - `name`: Name of the object, defaults to "Rectangles"
+    - `collection`: The collection to link the new object to
+
+    Returns: The object drawing the rectangles
+    """
+    world_positions = resolve_positions(positions)
+    count = len(world_positions)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(count)
+    mesh.vertices.foreach_set("co", world_positions.astype(np.float32).ravel())
+    for attribute, values in _rectangle_attribute_values(
+        count, sizes, colors, opacities
+    ).items():
+        data_type, _ = RECTANGLE_ATTRIBUTES[attribute]
+        mesh.attributes.new(attribute, data_type, "POINT")  # pyright: ignore
+        _set_rectangle_attribute(mesh, attribute, values)
+    mesh.update()
+
+    obj = bpy.data.objects.new(name, mesh)
+    coll = resolve_collection(collection)
+    coll.objects.link(obj)
+
+    # Offset the shared unit quad so that its anchor is at the point
+    group = get_or_create_rectangles_group()
+    modifier = apply_geonodes(obj, "Rectangles", group)
+    anchor_x, anchor_y = get_anchor_point(((0, 0), (1, 1)), anchor)
+    modifier[group_input_identifier(group, "Offset")] = (
+        0.5 - anchor_x,
+        0.5 - anchor_y,
+        0,
+    )
+    modifier[
+        group_input_identifier(group, "Material")
+    ] = get_or_create_attribute_emission_material("MgInstancerMat", "INSTANCER")
+
     set_object_default_properties(obj)
     return obj
+
+
+def animate_rectangles(
+    arg: ObjectArg,
+    frames: Sequence[int],
+    positions: Optional[np.ndarray] = None,
+    sizes: Optional[np.ndarray] = None,
+    colors: Optional[np.ndarray] = None,
+    opacities: Optional[np.ndarray] = None,
+    easing: EasingPreset = "smooth",
+):
+    """
+    Animates the rectangles of an object created by `create_rectangles`.
+
+    Values are given for every keyframe and every rectangle, in the same units as in
+    `create_rectangles`, and are keyframed on the point attributes of the object's mesh.
+    Rectangles whose value stays the same as their current value are not keyframed.
+
+    Arguments:
+
+    - `arg`: Object created by `create_rectangles`
+    - `frames`: Frame of each keyframe
+
+    Optional arguments:
+
+    - `positions`: Positions of shape (F, N, 2) or (F, N, 3), for F frames and N rectangles
+    - `sizes`: Sizes in pixels, of shape (F, N, 2)
+    - `colors`: Colors, of shape (F, N, 3)
+    - `opacities`: Opacities, of shape (F, N)
+    - `easing`: Easing preset for the animation, defaults to "smooth"
+    """
+    obj = resolve_object(arg)
+    mesh = cast(bpy.types.Mesh, obj.data)
+    count = len(mesh.vertices)
+    frame_count = len(frames)
+
+    keyed: dict[str, np.ndarray] = {}
+    if positions is not None:
+        positions = np.asarray(positions, dtype=np.float64)
+        keyed["position"] = resolve_positions(
+            positions.reshape(frame_count * count, -1)
+        ).reshape(frame_count, count, 3)
+    per_frame = [
+        _rectangle_attribute_values(
+            count,
+            sizes[i] if sizes is not None else None,
+            colors[i] if colors is not None else None,
+            opacities[i] if opacities is not None else None,
+        )
+        for i in range(frame_count)
+    ]
+    for attribute in per_frame[0] if per_frame else ():
+        keyed[attribute] = np.stack([values[attribute] for values in per_frame])
+
+    interpolation, easing_mode = EASING_PRESETS[easing]
+    with batch():
+        for attribute, values in keyed.items():
+            _, value_name = RECTANGLE_ATTRIBUTES[attribute]
+            values = values.reshape(frame_count, count, -1)
+            current = get_rectangle_attribute(mesh, attribute).reshape(count, -1)
+
+            # Only keyframe components that change
+            changing = np.any(~np.isclose(values, current[np.newaxis]), axis=0)
+            for index, component in zip(*np.nonzero(changing)):
+                insert_keyframes(
+                    mesh,
+                    f'attributes["{attribute}"].data[{index}].{value_name}',
+                    frames,
+                    values[:, index, component].tolist(),
+                    index=int(component),
+                    interpolation=interpolation,
+                    easing=easing_mode,
+                )
+
+
+def get_or_create_rectangles_group() -> bpy.types.GeometryNodeTree:
+    """
+    Gets or creates the Magnolia Rectangles node group, which places a unit quad on every point of
+    a mesh, scaled by the `mg_size` attribute of the point.
+    """
+    group = get_geonodes_group(RECTANGLES_GROUP_NAME)
+    if group is not None:
+        return group
+
+    group = cast(
+        bpy.types.GeometryNodeTree,
+        bpy.data.node_groups.new(
+            type="GeometryNodeTree", name=RECTANGLES_GROUP_NAME  # pyright: ignore
+        ),
+    )
+    group.is_modifier = True
+
+    # Socket Inputs: Geometry, Offset of the quad, Material
+    interface = cast(bpy.types.NodeTreeInterface, group.interface)
+    for socket_name, socket_type in [
+        ("Geometry", "NodeSocketGeometry"),
+        ("Offset", "NodeSocketVector"),
+        ("Material", "NodeSocketMaterial"),
+    ]:
+        interface.new_socket(
+            name=socket_name, in_out="INPUT", socket_type=socket_type  # pyright: ignore
+        )
+    interface.new_socket(
+        name="Geometry",
+        in_out="OUTPUT",
+        socket_type="NodeSocketGeometry",  # pyright: ignore
+    )
+
+    group_input = group.nodes.new("NodeGroupInput")
+    group_input.location = (-600, 0)
+    group_output = group.nodes.new("NodeGroupOutput")
+    group_output.location = (400, 0)
+
+    # Unit quad, offset so that its anchor is at the origin, with the rectangle material
+    grid = group.nodes.new("GeometryNodeMeshGrid")
+    grid.location = (-600, -200)
+    grid.inputs["Vertices X"].default_value = 2  # pyright: ignore
+    grid.inputs["Vertices Y"].default_value = 2  # pyright: ignore
+    transform = group.nodes.new("GeometryNodeTransform")
+    transform.location = (-400, -200)
+    set_material = group.nodes.new("GeometryNodeSetMaterial")
+    set_material.location = (-200, -200)
+    group.links.new(grid.outputs["Mesh"], transform.inputs["Geometry"])
+    group.links.new(group_input.outputs["Offset"], transform.inputs["Translation"])
+    group.links.new(transform.outputs["Geometry"], set_material.inputs["Geometry"])
+    group.links.new(group_input.outputs["Material"], set_material.inputs["Material"])
+
+    # Size of each rectangle, from the `mg_size` attribute
+    size = cast(
+        bpy.types.GeometryNodeInputNamedAttribute,
+        group.nodes.new("GeometryNodeInputNamedAttribute"),
+    )
+    size.location = (-400, -400)
+    size.data_type = "FLOAT_VECTOR"
+    size.inputs["Name"].default_value = "mg_size"  # pyright: ignore
+
+    # Instance the quad on every point. Point attributes such as `mg_color` and `mg_opacity` are
+    # carried over to the instances, where the material reads them.
+    instance = group.nodes.new("GeometryNodeInstanceOnPoints")
+    instance.location = (100, 0)
+    group.links.new(group_input.outputs["Geometry"], instance.inputs["Points"])
+    group.links.new(set_material.outputs["Geometry"], instance.inputs["Instance"])
+    size_output = size.outputs["Attribute"]  # pyright: ignore
+    group.links.new(size_output, instance.inputs["Scale"])
+    group.links.new(instance.outputs["Instances"], group_output.inputs[0])
+
+    return group
+
+
+def _rectangle_attribute_values(
+    count: int,
+    sizes: Optional[ArrayLike],
+    colors: Optional[ArrayLike],
+    opacities: Optional[ArrayLike],
+) -> dict[str, np.ndarray]:
+    """
+    Converts sizes, colors and opacities of rectangles to attribute values, one row per
+    rectangle. Values that are `None` are left out.
+    """
+    values: dict[str, np.ndarray] = {}
+    if sizes is not None:
+        # Sizes are scaled like `scale_size`, with a depth of 1
+        size_values = np.ones((count, 3))
+        size_values[:, :2] = np.broadcast_to(np.asarray(sizes, np.float64), (count, 2))
+        values["mg_size"] = size_values / (100, 100, 1)
+    if colors is not None:
+        color_values = np.ones((count, 4))
+        color_values[:, :3] = np.broadcast_to(
+            np.asarray(colors, np.float64) / 255, (count, 3)
+        )
+        values["mg_color"] = color_values
+    if opacities is not None:
+        values["mg_opacity"] = np.broadcast_to(
+            np.asarray(opacities, np.float64), (count,)
+        ).copy()
+    return values
+
+
+def _set_rectangle_attribute(mesh: bpy.types.Mesh, attribute: str, values: np.ndarray):
+    """
+    Writes the values of a point attribute in bulk.
+    """
+    _, value_name = RECTANGLE_ATTRIBUTES[attribute]
+    data = mesh.attributes[attribute].data  # pyright: ignore
+    data.foreach_set(value_name, values.astype(np.float32).ravel())
+
+
+def get_rectangle_attribute(mesh: bpy.types.Mesh, attribute: str) -> np.ndarray:
+    """
+    Reads the values of a point attribute of a rectangles mesh in bulk.
+
+    Arguments:
+
+    - `mesh`: The mesh of an object created by `create_rectangles`
+    - `attribute`: Name of the attribute, one of the keys of `RECTANGLE_ATTRIBUTES`
+
+    Returns: Array of the values, with one row per rectangle
+    """
+    data_type, value_name = RECTANGLE_ATTRIBUTES[attribute]
+    width = {"FLOAT": 1, "FLOAT_VECTOR": 3, "FLOAT_COLOR": 4}[data_type]
+    values = np.empty(len(mesh.vertices) * width, dtype=np.float32)
+    data = mesh.attributes[attribute].data  # pyright: ignore
+    data.foreach_get(value_name, values)
+    return values.reshape(-1, width)
+
+
+def group_input_identifier(group: bpy.types.GeometryNodeTree, name: str) -> str:
+    """
+    Returns the identifier of a node group input, which is the key of the input on a modifier.
+
+    Arguments:
+
+    - `group`: The node group
+    - `name`: Name of the input
+
+    Returns: The identifier of the input
+    """
+    interface = cast(bpy.types.NodeTreeInterface, group.interface)
+    socket = cast(bpy.types.NodeTreeInterfaceSocket, interface.items_tree[name])
+    return socket.identifier
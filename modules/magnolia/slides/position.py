@@ -1,9 +1,13 @@
-from typing import cast, Literal
+from typing import cast, Literal, Optional, Sequence, Union
 
 import bpy
 import mathutils
+import numpy as np
 
-from ..objects.object import ObjectArg, resolve_object
+from bpy.types import Object
+
+from ..objects.mesh import ensure_unique_mesh
+from ..objects.object import ObjectArg, ObjectsArg, resolve_object, resolve_objects
 
 Anchor = Literal[
     "topleft",
@@ -19,6 +23,12 @@ Anchor = Literal[
 
 Position = tuple[float, float] | tuple[float, float, float]
 
+BoundingBox = tuple[tuple[float, float], tuple[float, float]]
+
+# Bounding boxes by (mesh, vertex count, world matrix, modifier settings)
+_bounding_boxes: dict[tuple, BoundingBox] = {}
+_BOUNDING_BOX_CACHE_SIZE = 4096
+
 
 def resolve_position(position: Position) -> tuple[float, float, float]:
     """
@@ -31,6 +41,46 @@ def resolve_position(position: Position) -> tuple[float, float, float]:
 
     Regardless of the unit, resolving the position converts the position
     to a Blender world position.
+
+    To resolve many positions, use `resolve_positions`, which reads the slide dimensions once.
+    """
+    return _resolve_position(position, get_slide_dimensions())
+
+
+def resolve_positions(positions: Union[Sequence[Position], np.ndarray]) -> np.ndarray:
+    """
+    Resolves many Magnolia positions to Blender world positions at once.
+
+    Each coordinate is interpreted like in `resolve_position`: x and y values between 0 and 1
+    are proportions of the slide, other values are pixels.
+
+    Arguments:
+
+    - `positions`: Array of shape (N, 2) or (N, 3), or a list of positions of the same length
+
+    Returns: Array of world positions of shape (N, 3)
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if positions.size == 0:
+        return np.empty((0, 3))
+    if positions.ndim != 2 or positions.shape[1] not in (2, 3):
+        raise ValueError("Positions must have shape (N, 2) or (N, 3)")
+
+    slide_size = np.array(get_slide_dimensions(), dtype=np.float64)
+    xy = positions[:, :2]
+    xy = np.where((xy >= 0) & (xy <= 1), xy * slide_size, xy)
+
+    resolved = np.empty((len(positions), 3))
+    resolved[:, :2] = xy / 100
+    resolved[:, 2] = positions[:, 2] * 0.02 if positions.shape[1] == 3 else 0.02
+    return resolved
+
+
+def _resolve_position(
+    position: Position, slide_dimensions: tuple[int, int]
+) -> tuple[float, float, float]:
+    """
+    Resolves a position given the dimensions of the slide.
     """
     if len(position) == 2:
         x, y = position
@@ -38,7 +88,7 @@ def resolve_position(position: Position) -> tuple[float, float, float]:
     else:
         x, y, z = position
 
-    slide_width, slide_height = get_slide_dimensions()
+    slide_width, slide_height = slide_dimensions
 
     if x >= 0 and x <= 1:
         x = x * slide_width
@@ -78,64 +128,201 @@ def get_slide_dimensions() -> tuple[int, int]:
     )
 
 
-def get_bounding_box(
-    object: ObjectArg,
-) -> tuple[tuple[float, float], tuple[float, float]]:
+def get_bounding_box(object: ObjectArg, evaluated: bool = True) -> BoundingBox:
     """
     Given an object, returns the 2D bounding box of the object.
     Bounding box is of the form ((min_x, min_y), (max_x, max_y)).
+
+    Objects with modifiers, such as a border, are measured after evaluating their modifiers.
+    Bounding boxes are cached for each state of the object's mesh, world matrix and modifier
+    settings. If the vertices of a mesh are edited outside of Magnolia, call
+    `invalidate_bounding_boxes`.
+
+    Optional arguments:
+
+    - `evaluated`: Whether to include the effect of modifiers, defaults to `True`
     """
-    min_x = float("inf")
-    min_y = float("inf")
-    max_x = float("-inf")
-    max_y = float("-inf")
+    return _get_bounding_boxes([resolve_object(object)], evaluated)[0]
 
-    object = resolve_object(object)
-    mesh = cast(bpy.types.Mesh, object.data)
-    for vertex in mesh.vertices:
-        # Get the world coordinates of the vertex
-        world_vertex = object.matrix_world @ vertex.co
-        x, y, _ = world_vertex
 
-        min_x = min(min_x, x)
-        min_y = min(min_y, y)
-        max_x = max(max_x, x)
-        max_y = max(max_y, y)
+def get_bounding_boxes(objects: ObjectsArg, evaluated: bool = True) -> np.ndarray:
+    """
+    Returns the 2D bounding boxes of several objects as one array.
 
-    return ((min_x, min_y), (max_x, max_y))
+    Objects with modifiers are all evaluated with a single depsgraph update.
 
+    Arguments:
 
-def set_anchor(object: ObjectArg, anchor: Anchor):
+    - `objects`: Objects to measure
+
+    Optional arguments:
+
+    - `evaluated`: Whether to include the effect of modifiers, defaults to `True`
+
+    Returns: Array of shape (N, 2, 2), where each entry is of the form
+    ((min_x, min_y), (max_x, max_y))
     """
-    Changes the anchor of the object to the given anchor.
+    bounding_boxes = _get_bounding_boxes(resolve_objects(objects), evaluated)
+    return np.array(bounding_boxes, dtype=np.float64).reshape(-1, 2, 2)
+
+
+def invalidate_bounding_boxes(object: Optional[ObjectArg] = None):
     """
-    object = resolve_object(object)
-    (min_x, min_y), (max_x, max_y) = get_bounding_box(object)
+    Discards cached bounding boxes after mesh vertices are edited in place.
+
+    Optional arguments:
+
+    - `object`: Object whose mesh was edited, defaults to discarding all cached bounding boxes
+    """
+    if object is None:
+        _bounding_boxes.clear()
+        return
+    mesh_uid = cast(bpy.types.Mesh, resolve_object(object).data).session_uid
+    for key in [key for key in _bounding_boxes if key[0] == mesh_uid]:
+        del _bounding_boxes[key]
+
+
+def _get_bounding_boxes(objs: list[Object], evaluated: bool) -> list[BoundingBox]:
+    """
+    Returns the bounding boxes of objects, computing the ones that are not cached.
+    """
+    bounding_boxes: list[Optional[BoundingBox]] = []
+    misses: list[tuple[int, tuple, np.ndarray]] = []
+    for i, obj in enumerate(objs):
+        mesh = cast(bpy.types.Mesh, obj.data)
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        modifiers = _modifier_signature(obj) if evaluated else ()
+        key = (mesh.session_uid, len(mesh.vertices), matrix.tobytes(), modifiers)
+        bounding_box = _bounding_boxes.get(key)
+        if bounding_box is None:
+            misses.append((i, key, matrix))
+        bounding_boxes.append(bounding_box)
+
+    # Evaluating the depsgraph updates every modified object at once
+    depsgraph = None
+    if any(key[3] for _, key, _ in misses):
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    for i, key, matrix in misses:
+        obj = objs[i]
+        if depsgraph is not None and key[3]:
+            obj_eval = obj.evaluated_get(depsgraph)
+            try:
+                mesh = cast(bpy.types.Mesh, obj_eval.to_mesh())
+                bounding_box = _compute_bounding_box(mesh, matrix)
+            finally:
+                obj_eval.to_mesh_clear()
+        else:
+            bounding_box = _compute_bounding_box(cast(bpy.types.Mesh, obj.data), matrix)
+        if len(_bounding_boxes) >= _BOUNDING_BOX_CACHE_SIZE:
+            _bounding_boxes.clear()
+        _bounding_boxes[key] = bounding_box
+        bounding_boxes[i] = bounding_box
+
+    return cast(list[BoundingBox], bounding_boxes)
+
+
+def _modifier_signature(obj: Object) -> tuple:
+    """
+    Returns a hashable summary of the inputs of an object's enabled modifiers, such as the width
+    of a border. Returns an empty tuple if the object has no enabled modifiers.
+    """
+    signature = []
+    for modifier in obj.modifiers:
+        if not modifier.show_viewport:
+            continue
+        if isinstance(modifier, bpy.types.NodesModifier):
+            # Node group inputs are stored as custom properties, such as `Socket_1`
+            group = modifier.node_group
+            inputs = tuple(
+                (key, _hashable(modifier[key])) for key in sorted(modifier.keys())
+            )
+            settings = (group.session_uid if group is not None else None, inputs)
+        else:
+            settings = tuple(
+                _hashable(getattr(modifier, prop.identifier))
+                for prop in modifier.bl_rna.properties
+                if not prop.is_readonly
+            )
+        signature.append((modifier.name, modifier.type, settings))
+    return tuple(signature)
+
+
+def _hashable(value) -> object:
+    """
+    Converts a property value into something that can be part of a cache key.
+    """
+    if isinstance(value, bpy.types.ID):
+        return value.session_uid
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if hasattr(value, "to_list"):
+        return tuple(value.to_list())
+    if hasattr(value, "__len__") and not isinstance(value, str):
+        return tuple(value)
+    return value
+
+
+def _compute_bounding_box(mesh: bpy.types.Mesh, matrix: np.ndarray) -> BoundingBox:
+    """
+    Computes the 2D world-space bounding box of a mesh with one matrix multiply.
+    """
+    vertex_count = len(mesh.vertices)
+    if vertex_count == 0:
+        return ((float("inf"), float("inf")), (float("-inf"), float("-inf")))
+
+    coords = np.empty(vertex_count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+
+    # Only the x and y rows of the world matrix are needed
+    world = coords.reshape(-1, 3) @ matrix[:2, :3].T + matrix[:2, 3]
+    min_x, min_y = world.min(axis=0)
+    max_x, max_y = world.max(axis=0)
+    return ((float(min_x), float(min_y)), (float(max_x), float(max_y)))
+
+
+def get_anchor_point(bounding_box: BoundingBox, anchor: Anchor) -> tuple[float, float]:
+    """
+    Returns the point of a bounding box that corresponds to an anchor.
+    Bounding box is of the form ((min_x, min_y), (max_x, max_y)).
+    """
+    (min_x, min_y), (max_x, max_y) = bounding_box
     avg_x = (min_x + max_x) / 2
     avg_y = (min_y + max_y) / 2
 
     match anchor:
         case "topleft":
-            target = (min_x, max_y)
+            return (min_x, max_y)
         case "top":
-            target = (avg_x, max_y)
+            return (avg_x, max_y)
         case "topright":
-            target = (max_x, max_y)
+            return (max_x, max_y)
         case "left":
-            target = (min_x, avg_y)
+            return (min_x, avg_y)
         case "center":
-            target = (avg_x, avg_y)
+            return (avg_x, avg_y)
         case "right":
-            target = (max_x, avg_y)
+            return (max_x, avg_y)
         case "bottomleft":
-            target = (min_x, min_y)
+            return (min_x, min_y)
         case "bottom":
-            target = (avg_x, min_y)
+            return (avg_x, min_y)
         case "bottomright":
-            target = (max_x, min_y)
+            return (max_x, min_y)
+
+
+def set_anchor(object: ObjectArg, anchor: Anchor):
+    """
+    Changes the anchor of the object to the given anchor.
+
+    If the object shares its mesh with other objects, it is first given its own copy.
+    """
+    object = resolve_object(object)
+    target = get_anchor_point(get_bounding_box(object), anchor)
 
     # Translate object mesh data to match the new trasnformation
     (x, y) = object.matrix_world.translation[:2]
     translation = mathutils.Matrix.Translation((x - target[0], y - target[1], 0))
-    mesh = cast(bpy.types.Mesh, object.data)
+    mesh = ensure_unique_mesh(object)
     mesh.transform(translation)
+    invalidate_bounding_boxes(object)
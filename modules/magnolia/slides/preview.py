@@ -0,0 +1,513 @@
+import struct
+import zlib
+
+from typing import cast, Optional, Sequence
+
+import bpy
+import numpy as np
+
+from bpy.types import Object
+
+from .objects.rectangle import (
+    get_rectangle_attribute,
+    group_input_identifier,
+    RECTANGLES_GROUP_NAME,
+)
+
+# Object types that are drawn in previews
+PREVIEW_TYPES = {"MESH", "CURVE", "FONT"}
+
+# Color of materials whose color can't be read, and of the gaps of contact sheets
+PREVIEW_FALLBACK_COLOR = (0.5, 0.5, 0.5, 1.0)
+
+# Maximum number of (triangle, pixel) pairs tested at once
+_RASTER_BATCH_SIZE = 1 << 22
+
+
+def render_preview(
+    frame: Optional[int] = None,
+    width: int = 480,
+    scene: Optional[bpy.types.Scene] = None,
+) -> np.ndarray:
+    """
+    Draws a low resolution preview of a slide at a frame, without a render engine.
+
+    Slides are flat, emission shaded and seen from the front, so a preview only needs to fill
+    the triangles of every visible object with its color, from the back to the front. Colors are
+    read from emission materials, including the `mg_color` and `mg_opacity` properties of
+    attribute materials and the rectangles of `create_rectangles`. Lighting, textures and other
+    shaders are not drawn.
+
+    Optional arguments:
+
+    - `frame`: The frame to draw, defaults to the current frame
+    - `width`: Width of the preview in pixels, defaults to 480. The height follows the aspect
+      ratio of the slide.
+    - `scene`: The scene to draw, defaults to the current scene
+
+    Returns: The preview as an array of shape (height, width, 3) of 8-bit sRGB values
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    frames = [scene.frame_current if frame is None else frame]
+    return render_previews(frames, width=width, scene=scene)[0]
+
+
+def render_previews(
+    frames: Optional[Sequence[int]] = None,
+    width: int = 240,
+    scene: Optional[bpy.types.Scene] = None,
+) -> np.ndarray:
+    """
+    Draws low resolution previews of a slide at several frames, as `render_preview` does.
+
+    Meshes without modifiers are only triangulated once for all frames.
+
+    Optional arguments:
+
+    - `frames`: The frames to draw, defaults to every frame of the animation
+    - `width`: Width of the previews in pixels, defaults to 240
+    - `scene`: The scene to draw, defaults to the current scene
+
+    Returns: The previews as an array of shape (frames, height, width, 3) of 8-bit sRGB values
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if frames is None:
+        frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+    height = max(
+        round(width * scene.render.resolution_y / scene.render.resolution_x), 1
+    )
+
+    triangle_cache: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+    shading_cache: dict[str, tuple[tuple, Optional[str], bool]] = {}
+    previews = np.empty((len(frames), height, width, 3), dtype=np.uint8)
+    current_frame = scene.frame_current
+    try:
+        for index, frame in enumerate(frames):
+            scene.frame_set(frame)
+            image = _draw_scene(scene, width, height, triangle_cache, shading_cache)
+            previews[index] = _to_srgb(image).reshape(height, width, 3)
+    finally:
+        scene.frame_set(current_frame)
+    return previews
+
+
+def render_contact_sheet(
+    frames: Optional[Sequence[int]] = None,
+    count: int = 24,
+    columns: int = 6,
+    width: int = 240,
+    gap: int = 4,
+    scene: Optional[bpy.types.Scene] = None,
+) -> np.ndarray:
+    """
+    Draws previews of a slide at several frames, as `render_preview` does, arranged in a grid
+    from left to right, then top to bottom.
+
+    Optional arguments:
+
+    - `frames`: The frames to draw, defaults to `count` frames spread evenly over the animation
+    - `count`: Number of frames to draw if `frames` isn't given, defaults to 24
+    - `columns`: Number of columns of the grid, defaults to 6
+    - `width`: Width of each preview in pixels, defaults to 240
+    - `gap`: Space between and around the previews in pixels, defaults to 4
+    - `scene`: The scene to draw, defaults to the current scene
+
+    Returns: The contact sheet as an array of shape (height, width, 3) of 8-bit sRGB values
+    """
+    scene = cast(bpy.types.Scene, scene or bpy.context.scene)
+    if frames is None:
+        frames = np.unique(
+            np.linspace(scene.frame_start, scene.frame_end, count).round().astype(int)
+        ).tolist()
+    previews = render_previews(frames, width=width, scene=scene)
+    _, tile_height, tile_width, _ = previews.shape
+    rows = max(-(-len(previews) // columns), 1)
+
+    fallback = _to_srgb(np.array([PREVIEW_FALLBACK_COLOR[:3]]))[0]
+    sheet = np.empty(
+        (
+            rows * (tile_height + gap) + gap,
+            columns * (tile_width + gap) + gap,
+            3,
+        ),
+        dtype=np.uint8,
+    )
+    sheet[:] = fallback
+    for index, preview in enumerate(previews):
+        row, column = divmod(index, columns)
+        top = gap + row * (tile_height + gap)
+        left = gap + column * (tile_width + gap)
+        sheet[top : top + tile_height, left : left + tile_width] = preview
+    return sheet
+
+
+def write_png(path: str, image: np.ndarray):
+    """
+    Writes an image to a PNG file, without any image library.
+
+    Arguments:
+
+    - `path`: Path of the file to write
+    - `image`: Array of shape (height, width), (height, width, 3) or (height, width, 4) of
+      8-bit values, with the top row first
+    """
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width, channels = image.shape
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+
+    # Every row starts with its filter type, which is 0 for unfiltered rows
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, -1)
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    with open(bpy.path.abspath(path), "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(_png_chunk(b"IHDR", header))
+        file.write(_png_chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        file.write(_png_chunk(b"IEND", b""))
+
+
+def _draw_scene(
+    scene: bpy.types.Scene,
+    width: int,
+    height: int,
+    triangle_cache: dict[int, tuple[np.ndarray, np.ndarray]],
+    shading_cache: dict[str, tuple[tuple, Optional[str], bool]],
+) -> np.ndarray:
+    """
+    Draws the visible objects of a scene at its current frame, and returns the linear colors of
+    the pixels as an array of shape (height * width, 3).
+    """
+    # Slides span from the origin to the render resolution in pixels, at 100 pixels per meter
+    scale = np.array(
+        [
+            width / (scene.render.resolution_x / 100),
+            -height / (scene.render.resolution_y / 100),
+        ]
+    )
+    offset = np.array([0, height])
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    collections = _rendered_collections(scene)
+    layers = []
+    for obj in scene.objects:
+        if obj.type not in PREVIEW_TYPES or not _is_visible(obj, collections):
+            continue
+        opacity = float(cast(float, obj.get("mg_opacity", 1.0)))
+        if opacity <= 0:
+            continue
+        layer = _rectangle_triangles(obj, opacity)
+        if layer is None:
+            layer = _object_triangles(
+                obj, depsgraph, opacity, triangle_cache, shading_cache
+            )
+        if layer is None:
+            continue
+
+        # Vertices are moved to world space, then to pixels
+        vertices, colors = layer
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        world = vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        pixels = world[..., :2] * scale + offset
+        layers.append((float(world[..., 2].mean()), pixels, colors))
+
+    # Layers are drawn from the lowest to the highest, in scene order at the same height
+    image = np.zeros((height * width, 3))
+    for _, pixels, colors in sorted(layers, key=lambda layer: layer[0]):
+        pixel_indices, triangle_indices = _rasterize(pixels, width, height)
+        if len(pixel_indices) == 0:
+            continue
+        rgba = colors[triangle_indices]
+        alpha = rgba[:, 3:]
+        image[pixel_indices] = image[pixel_indices] * (1 - alpha) + rgba[:, :3] * alpha
+    return image
+
+
+def _object_triangles(
+    obj: Object,
+    depsgraph: bpy.types.Depsgraph,
+    opacity: float,
+    triangle_cache: dict[int, tuple[np.ndarray, np.ndarray]],
+    shading_cache: dict[str, tuple[tuple, Optional[str], bool]],
+) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns the triangles of an object in object space, as an array of shape (T, 3, 3), and the
+    linear RGBA color of each triangle, or `None` if it has no triangles.
+    """
+    mesh = obj.data if obj.type == "MESH" else None
+    if isinstance(mesh, bpy.types.Mesh) and not obj.modifiers:
+        # Meshes without modifiers look the same at every frame
+        key = mesh.session_uid
+        if key not in triangle_cache:
+            triangle_cache[key] = _mesh_triangles(mesh)
+        vertices, material_indices = triangle_cache[key]
+    else:
+        evaluated = obj.evaluated_get(depsgraph)
+        try:
+            evaluated_mesh = evaluated.to_mesh()
+            if evaluated_mesh is None:
+                return None
+            vertices, material_indices = _mesh_triangles(evaluated_mesh)
+        finally:
+            evaluated.to_mesh_clear()
+    if len(vertices) == 0:
+        return None
+
+    slot_colors = np.array(
+        [
+            _object_color(obj, slot.material, opacity, shading_cache)
+            for slot in obj.material_slots
+        ]
+        or [_object_color(obj, None, opacity, shading_cache)]
+    )
+    colors = slot_colors[np.clip(material_indices, 0, len(slot_colors) - 1)]
+    return vertices, colors
+
+
+def _rectangle_triangles(
+    obj: Object, opacity: float
+) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns the triangles and colors of the rectangles of an object created by
+    `create_rectangles`, like `_object_triangles`, or `None` if it is another object.
+    """
+    modifier = next(
+        (
+            modifier
+            for modifier in obj.modifiers
+            if isinstance(modifier, bpy.types.NodesModifier)
+            and modifier.node_group is not None
+            and modifier.node_group.name == RECTANGLES_GROUP_NAME
+        ),
+        None,
+    )
+    if modifier is None:
+        return None
+    mesh = cast(bpy.types.Mesh, obj.data)
+    group = cast(bpy.types.GeometryNodeTree, modifier.node_group)
+
+    # Each rectangle is a unit quad around its point, offset by its anchor and scaled by its size
+    points = get_rectangle_attribute(mesh, "position")
+    sizes = get_rectangle_attribute(mesh, "mg_size")
+    offset = np.array(modifier[group_input_identifier(group, "Offset")])
+    corners = np.array([[-0.5, -0.5, 0], [-0.5, 0.5, 0], [0.5, 0.5, 0], [0.5, -0.5, 0]])
+    quads = points[:, np.newaxis] + sizes[:, np.newaxis] * (offset + corners)
+    vertices = quads[:, [[0, 1, 2], [0, 2, 3]]].reshape(-1, 3, 3)
+
+    # The instancer material multiplies the opacity of each rectangle by that of the object
+    colors = get_rectangle_attribute(mesh, "mg_color").astype(np.float64)
+    colors[:, 3] *= get_rectangle_attribute(mesh, "mg_opacity")[:, 0] * opacity
+    return vertices, np.repeat(colors, 2, axis=0)
+
+
+def _mesh_triangles(mesh: bpy.types.Mesh) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Triangulates a mesh, and returns its triangles as an array of shape (T, 3, 3) and the
+    material index of each triangle.
+    """
+    mesh.calc_loop_triangles()
+    triangle_count = len(mesh.loop_triangles)
+    coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", coordinates)
+    indices = np.empty(triangle_count * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", indices)
+    material_indices = np.empty(triangle_count, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("material_index", material_indices)
+    vertices = coordinates.reshape(-1, 3)[indices].reshape(-1, 3, 3)
+    return vertices, material_indices
+
+
+def _object_color(
+    obj: Object,
+    material: Optional[bpy.types.Material],
+    opacity: float,
+    shading_cache: dict[str, tuple[tuple, Optional[str], bool]],
+) -> tuple[float, float, float, float]:
+    """
+    Returns the linear RGBA color of an object drawn with a material.
+    """
+    if material is None:
+        return PREVIEW_FALLBACK_COLOR
+    if material.name not in shading_cache:
+        shading_cache[material.name] = _material_shading(material)
+    color, attribute_type, uses_opacity = shading_cache[material.name]
+
+    if attribute_type == "OBJECT" and "mg_color" in obj:
+        color = tuple(cast(Sequence[float], obj["mg_color"]))
+    red, green, blue = color[:3]
+    alpha = color[3] if len(color) > 3 else 1.0
+    if uses_opacity:
+        alpha *= opacity
+    return (red, green, blue, alpha)
+
+
+def _material_shading(
+    material: bpy.types.Material,
+) -> tuple[tuple, Optional[str], bool]:
+    """
+    Reads how a material is drawn in previews: its linear RGBA color, the type of the attribute
+    node its color is read from, if any, and whether it reads the `mg_opacity` property.
+    """
+    if not material.use_nodes or material.node_tree is None:
+        return tuple(material.diffuse_color), None, False  # pyright: ignore
+    nodes = material.node_tree.nodes
+
+    uses_opacity = any(
+        isinstance(node, bpy.types.ShaderNodeAttribute)
+        and node.attribute_name == "mg_opacity"
+        for node in nodes
+    )
+    color_input = None
+    for node in nodes:
+        if node.bl_idname == "ShaderNodeEmission":
+            color_input = node.inputs["Color"]
+            break
+        if node.bl_idname == "ShaderNodeBsdfPrincipled":
+            color_input = node.inputs["Base Color"]
+    if color_input is None:
+        return tuple(material.diffuse_color), None, uses_opacity  # pyright: ignore
+
+    if color_input.is_linked:
+        from_node = color_input.links[0].from_node  # pyright: ignore
+        if (
+            isinstance(from_node, bpy.types.ShaderNodeAttribute)
+            and from_node.attribute_name == "mg_color"
+        ):
+            return PREVIEW_FALLBACK_COLOR, from_node.attribute_type, uses_opacity
+        return PREVIEW_FALLBACK_COLOR, None, uses_opacity
+    color = tuple(color_input.default_value)  # pyright: ignore
+    return color, None, uses_opacity
+
+
+def _rendered_collections(scene: bpy.types.Scene) -> set[bpy.types.Collection]:
+    """
+    Returns the collections of a scene that are rendered at the current frame: those that are
+    included in the view layer, and that are not hidden in renders along with all their parents.
+    """
+    view_layer = cast(bpy.types.ViewLayer, bpy.context.view_layer)
+    if view_layer not in scene.view_layers.values():
+        view_layer = cast(bpy.types.ViewLayer, scene.view_layers[0])
+
+    collections = set()
+    layer_collections = [view_layer.layer_collection]
+    while layer_collections:
+        layer_collection = layer_collections.pop()
+        collection = layer_collection.collection
+        if layer_collection.exclude or collection.hide_render:
+            continue
+        collections.add(collection)
+        layer_collections.extend(layer_collection.children)
+    return collections
+
+
+def _is_visible(obj: Object, collections: set[bpy.types.Collection]) -> bool:
+    """
+    Returns whether an object is rendered at the current frame, given the rendered collections.
+    """
+    if obj.hide_render:
+        return False
+    return any(collection in collections for collection in obj.users_collection)
+
+
+def _rasterize(
+    triangles: np.ndarray, width: int, height: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the pixels whose centers are inside triangles given in pixel coordinates, as an array
+    of shape (T, 3, 2).
+
+    Returns: The index of each covered pixel, counting rows from the top, and the index of the
+    last triangle covering it
+    """
+    spans = _triangle_spans(triangles, width, height)
+    rows, starts, counts, span_triangles = spans
+
+    last_triangles = np.full(width * height, -1, dtype=np.int64)
+    ends = np.cumsum(counts)
+    first = 0
+    while first < len(counts):
+        # Spans are filled in batches, to bound the number of pixels in memory
+        limit = (ends[first - 1] if first > 0 else 0) + _RASTER_BATCH_SIZE
+        last = max(int(np.searchsorted(ends, limit, side="right")), first + 1)
+        batch_counts = counts[first:last]
+        total = int(batch_counts.sum())
+        span_indices = np.repeat(np.arange(first, last), batch_counts)
+        offsets = np.arange(total) - np.repeat(
+            np.cumsum(batch_counts) - batch_counts, batch_counts
+        )
+        pixels = rows[span_indices] * width + starts[span_indices] + offsets
+        np.maximum.at(last_triangles, pixels, span_triangles[span_indices])
+        first = last
+
+    pixel_indices = np.flatnonzero(last_triangles >= 0)
+    return pixel_indices, last_triangles[pixel_indices]
+
+
+def _triangle_spans(
+    triangles: np.ndarray, width: int, height: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Splits triangles in pixel coordinates into horizontal runs of covered pixels.
+
+    Returns: The row, first column and number of pixels of each run, and its triangle
+    """
+    # Triangles are made counterclockwise, so that their inside is left of every edge
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    area = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (
+        c[:, 0] - a[:, 0]
+    )
+    flipped = (area < 0)[:, np.newaxis]
+    b, c = np.where(flipped, c, b), np.where(flipped, b, c)
+
+    # One run per triangle and row of pixel centers within its bounding box
+    first_rows = np.maximum(np.ceil(triangles[:, :, 1].min(axis=1) - 0.5), 0)
+    last_rows = np.minimum(np.floor(triangles[:, :, 1].max(axis=1) - 0.5), height - 1)
+    row_counts = np.where(area != 0, np.maximum(last_rows - first_rows + 1, 0), 0)
+    row_counts = row_counts.astype(np.int64)
+    span_triangles = np.repeat(np.arange(len(triangles)), row_counts)
+    rows = first_rows.astype(np.int64)[span_triangles] + (
+        np.arange(len(span_triangles))
+        - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    )
+    centers = rows + 0.5
+
+    # Each edge bounds the run on the left or on the right, where it crosses the row
+    lows = np.full(len(rows), -1.0)
+    highs = np.full(len(rows), width + 1.0)
+    empty = np.zeros(len(rows), dtype=bool)
+    for start, end in ((a, b), (b, c), (c, a)):
+        dx = (end[:, 0] - start[:, 0])[span_triangles]
+        dy = (end[:, 1] - start[:, 1])[span_triangles]
+        x, y = start[span_triangles, 0], start[span_triangles, 1]
+        # The center (px, centers) is inside if dx * (centers - y) - dy * (px - x) >= 0
+        side = dx * (centers - y) + dy * x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = side / dy
+        lows = np.where(dy < 0, np.maximum(lows, crossing), lows)
+        highs = np.where(dy > 0, np.minimum(highs, crossing), highs)
+        empty |= (dy == 0) & (side < 0)
+
+    starts = np.maximum(np.ceil(np.clip(lows, -1, width + 1) - 0.5), 0)
+    stops = np.minimum(np.floor(np.clip(highs, -1, width + 1) - 0.5), width - 1)
+    counts = np.where(empty, 0, np.maximum(stops - starts + 1, 0)).astype(np.int64)
+    return rows, starts.astype(np.int64), counts, span_triangles
+
+
+def _to_srgb(image: np.ndarray) -> np.ndarray:
+    """
+    Converts linear colors to 8-bit sRGB values, as the Standard view transform does.
+    """
+    image = np.clip(image, 0, 1)
+    srgb = np.where(
+        image <= 0.0031308, image * 12.92, 1.055 * image ** (1 / 2.4) - 0.055
+    )
+    return (srgb * 255).round().astype(np.uint8)
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    """
+    Returns a PNG chunk with its length and checksum.
+    """
+    checksum = zlib.crc32(tag + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", checksum)
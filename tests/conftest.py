@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "modules"))
+
+
+class _StubModule(types.ModuleType):
+    """
+    Module whose missing attributes are empty classes, so that type annotations and
+    `isinstance` checks that refer to Blender types work at import time.
+    """
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = type(name, (), {"__module__": self.__name__})
+        setattr(self, name, value)
+        return value
+
+
+def _install_blender_stubs():
+    """
+    Stubs the modules of Blender's Python API, so that the pure Python and NumPy parts of Magnolia
+    can be tested outside of Blender. Anything that actually calls Blender fails.
+    """
+    names = ("bpy", "bpy.types", "bpy_extras", "bpy_extras.anim_utils", "mathutils")
+    for name in names:
+        sys.modules[name] = _StubModule(name)
+    for name in ("app", "context", "data", "ops", "path", "props", "utils"):
+        setattr(sys.modules["bpy"], name, types.SimpleNamespace())
+    setattr(sys.modules["bpy"], "types", sys.modules["bpy.types"])
+    setattr(
+        sys.modules["bpy_extras"], "anim_utils", sys.modules["bpy_extras.anim_utils"]
+    )
+
+
+try:
+    import bpy  # noqa: F401
+except ImportError:
+    _install_blender_stubs()
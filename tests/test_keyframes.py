@@ -0,0 +1,68 @@
+import numpy as np
+
+from magnolia.animation.keyframes import changing_spans, INTERPOLATION_VALUES
+
+
+class KeyframePoints:
+    """
+    Keyframe points of an F-curve, read through `foreach_get` like Blender's.
+    """
+
+    def __init__(self, frames, values, interpolation):
+        count = len(frames)
+        co = np.column_stack((frames, values))
+        self.data = {
+            "co": co,
+            "handle_left": co,
+            "handle_right": co,
+            "handle_left_type": np.zeros(count),
+            "handle_right_type": np.zeros(count),
+            "interpolation": np.full(count, INTERPOLATION_VALUES[interpolation]),
+            "easing": np.zeros(count),
+        }
+
+    def __len__(self):
+        return len(self.data["co"])
+
+    def foreach_get(self, name, values):
+        values[:] = np.ravel(self.data[name])
+
+
+class FCurve:
+    def __init__(self, frames, values, interpolation="CONSTANT"):
+        self.keyframe_points = KeyframePoints(frames, values, interpolation)
+        self.mute = False
+        self.modifiers = []
+        self.extrapolation = "CONSTANT"
+
+
+def changes_at(spans, frames):
+    """
+    Returns whether any span changes the value between each frame and the previous frame.
+    """
+    frames = np.asarray(frames)
+    return np.any(
+        (spans[:, 0, np.newaxis] < frames) & (spans[:, 1, np.newaxis] > frames - 1),
+        axis=0,
+    ).tolist()
+
+
+def test_constant_jump_changes_on_keyframe():
+    spans = changing_spans(FCurve([99, 100], [1, 0]))
+    assert changes_at(spans, [99, 100, 101]) == [False, True, False]
+
+
+def test_hide_and_show_changes_on_both_keyframes():
+    spans = changing_spans(FCurve([9, 10, 99, 100], [0, 1, 1, 0]))
+    assert changes_at(spans, [9, 10, 11, 99, 100, 101]) == [
+        False,
+        True,
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_constant_hold_does_not_change():
+    assert len(changing_spans(FCurve([1, 50], [1, 1]))) == 0
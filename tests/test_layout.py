@@ -0,0 +1,31 @@
+import numpy as np
+
+from magnolia.slides.layout import compute_layout
+
+
+def test_row_places_items_left_to_right():
+    cells, container = compute_layout(np.array([[1, 1], [2, 1]]), gap=(0.5, 0))
+    assert cells.tolist() == [[[0, 0], [1, 1]], [[1.5, 0], [3.5, 1]]]
+    assert container.tolist() == [[0, 0], [3.5, 1]]
+
+
+def test_column_places_items_top_to_bottom():
+    cells, container = compute_layout(np.array([[1, 1], [2, 2]]), direction="column")
+    assert cells.tolist() == [[[0, 2], [2, 3]], [[0, 0], [2, 2]]]
+    assert container.tolist() == [[0, 0], [2, 3]]
+
+
+def test_grid_is_square_by_default():
+    cells, container = compute_layout(np.ones((4, 2)), direction="grid", padding=(1, 1))
+    assert cells.tolist() == [
+        [[1, 2], [2, 3]],
+        [[2, 2], [3, 3]],
+        [[1, 1], [2, 2]],
+        [[2, 1], [3, 2]],
+    ]
+    assert container.tolist() == [[0, 0], [4, 4]]
+
+
+def test_uniform_cells_fit_largest_item():
+    cells, _ = compute_layout(np.array([[1, 3], [2, 1]]), uniform=True)
+    assert (cells[:, 1] - cells[:, 0]).tolist() == [[2, 3], [2, 3]]
@@ -0,0 +1,21 @@
+import numpy as np
+
+from magnolia.objects.material import material_config_hash
+
+
+def test_equal_numbers_of_different_types_hash_the_same():
+    expected = material_config_hash("emission", {"color": (1.0, 0.0, 0.0, 1.0)})
+    for color in ((1, 0, 0, 1), np.array([1, 0, 0, 1], dtype=np.float32)):
+        assert material_config_hash("emission", {"color": color}) == expected
+
+
+def test_numpy_scalars_hash_like_floats():
+    assert material_config_hash("bsdf", {"Roughness": np.float32(0.25)}) == (
+        material_config_hash("bsdf", {"Roughness": 0.25})
+    )
+
+
+def test_bools_are_not_numbers():
+    assert material_config_hash("emission", {"opacity_control": True}) != (
+        material_config_hash("emission", {"opacity_control": 1})
+    )
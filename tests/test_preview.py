@@ -0,0 +1,44 @@
+import struct
+import zlib
+
+import numpy as np
+
+from magnolia.slides import preview
+
+
+def test_rasterize_covers_pixel_centers_inside_triangle():
+    triangle = np.array([[[0, 0], [4.2, 0], [0, 4.2]]])
+    pixel_indices, triangle_indices = preview._rasterize(triangle, 4, 4)
+    expected = [row * 4 + column for row in range(4) for column in range(4 - row)]
+    assert sorted(pixel_indices.tolist()) == expected
+    assert triangle_indices.tolist() == [0] * len(expected)
+
+
+def test_rasterize_keeps_last_triangle():
+    square = np.array([[0, 0], [2, 0], [2, 2], [0, 2]])
+    triangles = np.array([square[[0, 1, 2]], square[[0, 2, 3]], square[[0, 1, 2]]])
+    pixel_indices, triangle_indices = preview._rasterize(triangles, 2, 2)
+    assert pixel_indices.tolist() == [0, 1, 2, 3]
+    assert triangle_indices.tolist() == [2, 2, 1, 2]
+
+
+def test_write_png_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview.bpy.path, "abspath", lambda path: path, raising=False)
+    image = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    path = tmp_path / "preview.png"
+    preview.write_png(str(path), image)
+
+    data = path.read_bytes()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    offset = 8
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset : offset + 4])
+        tag = data[offset + 4 : offset + 8]
+        chunks[tag] = data[offset + 8 : offset + 8 + length]
+        offset += length + 12
+    assert struct.unpack(">IIBBBBB", chunks[b"IHDR"]) == (3, 2, 8, 2, 0, 0, 0)
+    rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    rows = rows.reshape(2, -1)
+    assert rows[:, 0].tolist() == [0, 0]
+    assert (rows[:, 1:].reshape(2, 3, 3) == image).all()
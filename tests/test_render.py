@@ -0,0 +1,17 @@
+from magnolia.scene.render import _split_frames
+
+
+def test_split_equal_costs_into_equal_runs():
+    assert _split_frames([1, 2, 3, 4, 5, 6], [1] * 6, 3) == [[1, 2], [3, 4], [5, 6]]
+
+
+def test_split_balances_costs():
+    assert _split_frames([1, 2, 3, 4, 5], [4, 1, 1, 1, 1], 2) == [[1], [2, 3, 4, 5]]
+
+
+def test_split_puts_expensive_runs_first():
+    assert _split_frames([1, 2, 3, 4, 5], [1, 1, 1, 1, 6], 2) == [[5], [1, 2, 3, 4]]
+
+
+def test_split_into_more_runs_than_frames():
+    assert _split_frames([1, 2], [1, 1], 4) == [[1], [2]]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from magnolia.animation.visibility import VisibilitySchedule
+
+
+def schedule_of(*toggles):
+    schedule = VisibilitySchedule()
+    for frame, is_visible in toggles:
+        schedule.toggle(frame, is_visible)
+    return schedule
+
+
+def visible_at(keyframes, frames):
+    """
+    Returns whether an object is visible at each frame, given constant visibility keyframes.
+    """
+    key_frames, key_visible = keyframes
+    indices = np.searchsorted(key_frames, frames, side="right") - 1
+    return [key_visible[max(index, 0)] for index in indices]
+
+
+def per_frame_keyframes(*toggles):
+    """
+    Returns the keyframes that toggling visibility one frame at a time used to write: the opposite
+    state on the frame before each toggle, and the new state on the frame of the toggle.
+    """
+    keyframes = {}
+    for frame, is_visible in toggles:
+        keyframes[frame - 1] = not is_visible
+        keyframes[frame] = is_visible
+    frames = sorted(keyframes)
+    return frames, [keyframes[frame] for frame in frames]
+
+
+def test_overlapping_toggles_merge():
+    schedule = schedule_of((10, True), (30, False), (20, True), (40, False))
+    assert schedule.intervals() == [(10, 30)]
+    assert schedule.compile() == ([9, 10, 30], [False, True, False])
+
+
+def test_hide_before_show():
+    schedule = schedule_of((10, True), (5, False))
+    assert schedule.intervals() == [(float("-inf"), 5), (10, float("inf"))]
+    assert schedule.compile() == ([4, 5, 10], [True, False, True])
+
+
+def test_repeated_toggle_on_same_frame_keeps_last():
+    schedule = schedule_of((10, True), (10, False))
+    assert schedule.compile() == ([9, 10], [True, False])
+
+
+def test_empty_schedule_keeps_initial_state():
+    assert VisibilitySchedule(initially_visible=False).compile() == ([0], [False])
+
+
+def test_matches_per_frame_keyframes():
+    toggles = [(10, True), (30, False), (50, True), (70, False)]
+    frames = np.arange(0, 80)
+    compiled = schedule_of(*toggles).compile()
+    assert visible_at(compiled, frames) == visible_at(
+        per_frame_keyframes(*toggles), frames
+    )
+    assert len(compiled[0]) < len(per_frame_keyframes(*toggles)[0])